@@ -0,0 +1,111 @@
+from config import *
+from Application import elommr as mmr
+import collections
+
+
+class CurveCache:
+    """
+    Least recently used cache of opponents' win and loss curves over the rating grid. Entries are keyed on the exact
+    rating and uncertainty, so cached curves are the ones computed directly. With decimals set, both are rounded to
+    that many places and the curves are built from the rounded values, trading accuracy for hits.
+
+    Attributes
+    ----------
+    maxsize : int
+        maximum number of (win, loss) curve pairs kept
+    decimals : int
+        rounding of rating and uncertainty in the key, None for none
+    curves : OrderedDict
+        {(rating, uncertainty, method, min, max, points): (win, loss)}, least recently used first
+    hits : int
+        curves served from the cache
+    misses : int
+        curves computed
+    """
+    def __init__(self, maxsize=curve_cache_size, decimals=None):
+        self.maxsize = maxsize
+        self.decimals = decimals
+        self.curves = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.curves)
+
+    @property
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0
+
+    def stats(self):
+        return {'size': len(self.curves), 'maxsize': self.maxsize, 'hits': self.hits, 'misses': self.misses,
+                'hit_rate': self.hit_rate}
+
+    def clear(self):
+        self.curves.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, x, skill, uncertainty, method='normal'):
+        """
+        Win and loss curves of many opponents
+
+        Parameters
+        ----------
+        x : ndarray
+            evenly spaced rating grid
+        skill : ndarray
+            (N) opponent ratings
+        uncertainty : ndarray
+            (N) opponent uncertainties
+        method : str
+            normal: Gaussian distribution
+            logistic: logistic distribution
+
+        Returns
+        ----------
+        win : ndarray
+            (N x M) win distributions
+        loss : ndarray
+            (N x M) loss distributions
+        """
+        skill, uncertainty = np.asarray(skill, dtype=float), np.asarray(uncertainty, dtype=float)
+        if self.decimals is not None:
+            skill, uncertainty = np.round(skill, self.decimals), np.round(uncertainty, self.decimals)
+        grid = (float(x[0]), float(x[-1]), len(x))
+
+        win, loss = np.empty((len(skill), len(x))), np.empty((len(skill), len(x)))
+        missing = dict()
+        for i, key in enumerate(zip(skill.tolist(), uncertainty.tolist())):
+            key = key + (method,) + grid
+            if key in missing:
+                missing[key].append(i)
+                self.hits += 1
+                continue
+            curve = self.curves.get(key)
+            if curve is None:
+                missing[key] = [i]
+                self.misses += 1
+            else:
+                self.curves.move_to_end(key)
+                win[i], loss[i] = curve
+                self.hits += 1
+
+        if missing:
+            keys = list(missing)
+            s = np.array([key[0] for key in keys])[:, np.newaxis]
+            u = np.array([key[1] for key in keys])[:, np.newaxis]
+            scratch = np.empty((len(keys), len(x)))
+            new_win = mmr.win_distribution(x, s, u, method=method, scratch=scratch)
+            new_loss = mmr.loss_distribution(x, s, u, method=method, scratch=scratch)
+            for k, key in enumerate(keys):
+                win[missing[key]] = new_win[k]
+                loss[missing[key]] = new_loss[k]
+                self.curves[key] = (new_win[k].copy(), new_loss[k].copy())
+            while len(self.curves) > self.maxsize:
+                self.curves.popitem(last=False)
+        return win, loss
+
+
+# Shared by every match in a process
+curve_cache = CurveCache()
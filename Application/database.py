@@ -1,6 +1,6 @@
 from config import *
 from Utilities import filehandler
-from Application import rating
+from Application import rating, schema
 
 
 def get_competitor_rating(competitor, file=ratings_db):
@@ -27,49 +27,91 @@ def get_competitor_rating(competitor, file=ratings_db):
     try:
         competitor.member.upper()
     except AttributeError:
+        return assign_rating(competitor, None)
+
+    data = get_ratings_bulk([competitor.member], competitor.division, competitor.match_type, file=file)
+    return assign_rating(competitor, data.get(competitor.member.upper()))
+
+
+def get_ratings_bulk(members, division, match_type, file=ratings_db, chunk_size=900):
+    """
+    Most recent rating info for many members in one round trip
+
+    Parameters
+    ----------
+    members : list
+        USPSA member numbers
+    division : str
+        Name of the division
+    match_type : str
+        Type of match
+    file : str
+        file path to .db file
+    chunk_size : int
+        maximum number of members per query, below SQLite's host parameter limit
+
+    Returns
+    -------
+    ratings : dict
+        {MEMBER: (rating, uncertainty, match_count)} keyed by upper case member number, members without an entry are
+        left out
+    """
+
+    members = list(dict.fromkeys(member.upper() for member in members if member is not None))
+    if not members:
+        return dict()
+
+    schema.ensure(file)
+    ratings = dict()
+    with filehandler.database(file) as cursor:
+        for i in range(0, len(members), chunk_size):
+            chunk = members[i:i + chunk_size]
+            sql = '''SELECT member_key, rating, uncertainty, match_count FROM current_ratings
+                     WHERE member_key IN ({}) AND division=? AND match_type=?'''.format(','.join('?' * len(chunk)))
+            cursor.execute(sql, (*chunk, division, match_type))
+
+            try:
+                data = cursor.fetchall()
+            except:
+                raise IndexError('DATABASE: Read error.')
+
+            for row in data:
+                ratings[row[0]] = row[1:]
+    return ratings
+
+
+def assign_rating(competitor, data):
+    """
+    Sets a competitor's rating info from a database row, or the new shooter defaults
+
+    Parameters
+    ----------
+    competitor : rating.Competitor
+        Competitor info.
+    data : tuple
+        (rating, uncertainty, match_count), None for a new shooter
+
+    Returns
+    -------
+    competitor : rating.Competitor
+        Updated with rating info
+    """
+
+    if data is None:
         competitor.noob = True
         competitor.number_of_matches = 0
         competitor.rating = noob_skill
         competitor.uncertainty = noob_uncertainty
         return competitor
-    else:
-        try:
-            (cursor, conn) = filehandler.open_database(file)
-        except FileNotFoundError:
-            raise FileNotFoundError
-        except sqlite3.InterfaceError:
-            raise FileNotFoundError
-
-        sql = '''SELECT rating, uncertainty, match_count FROM ratings
-                    WHERE UPPER(uspsa_number)=? AND division=? AND match_type=?
-                    ORDER BY match_date_unix DESC
-                    LIMIT 1'''
-        cursor.execute(sql, (competitor.member.upper(), competitor.division, competitor.match_type))
-
-        try:
-            data = cursor.fetchall()
-        except:
-            filehandler.close_database(cursor, conn)
-            raise IndexError('DATABASE: Read error.')
-
-        if not data:
-            filehandler.close_database(cursor, conn)
-            competitor.noob = True
-            competitor.number_of_matches = 0
-            competitor.rating = noob_skill
-            competitor.uncertainty = noob_uncertainty
-            return competitor
 
     competitor.noob = False
-    competitor.rating = data[0][0]
-    competitor.uncertainty = data[0][1]
+    competitor.rating = data[0]
+    competitor.uncertainty = data[1]
 
-    if data[0][2] is None or data[0][2] == '':
+    if data[2] is None or data[2] == '':
         competitor.number_of_matches = 0
     else:
-        competitor.number_of_matches = data[0][2]
-
-    filehandler.close_database(cursor, conn)
+        competitor.number_of_matches = data[2]
     return competitor
 
 
@@ -94,47 +136,28 @@ def get_competitor_all(member_number, division, match_type='Pistol', file=rating
         All Competitor info. If there is no entry for a competitor, returns FALSE
     """
 
-    try:
-        (cursor, conn) = filehandler.open_database(file)
-    except FileNotFoundError:
-        raise FileNotFoundError
-    except sqlite3.InterfaceError:
-        raise FileNotFoundError
-
-    sql = '''SELECT * FROM ratings
-             WHERE UPPER(uspsa_number)=? AND division=? AND match_type=?
-             ORDER BY match_date_unix DESC
-             LIMIT 1'''
-    cursor.execute(sql, (member_number.upper(), division, match_type))
-
-    try:
-        data = cursor.fetchall()
-    except:
-        filehandler.close_database(cursor, conn)
-        raise IndexError('DATABASE: Read error.')
+    schema.ensure(file)
+    with filehandler.database(file) as cursor:
+        sql = '''SELECT * FROM current_ratings
+                 WHERE member_key=? AND division=? AND match_type=?'''
+        cursor.execute(sql, (member_number.upper(), division, match_type))
 
-    if not data:
-        filehandler.close_database(cursor, conn)
-        return False
+        try:
+            data = cursor.fetchall()
+        except:
+            raise IndexError('DATABASE: Read error.')
 
-    ## Get Column info
-    try:
-        (cursor, conn) = filehandler.open_database(file)
-    except FileNotFoundError:
-        raise FileNotFoundError
-    except sqlite3.InterfaceError:
-        raise FileNotFoundError
+        if not data:
+            return False
 
-    sql = '''PRAGMA table_info(ratings)'''
-    cursor.execute(sql)
+        ## Get Column info
+        sql = '''PRAGMA table_info(current_ratings)'''
+        cursor.execute(sql)
 
-    try:
-        columns = cursor.fetchall()
-    except:
-        filehandler.close_database(cursor, conn)
-        raise IndexError('DATABASE: Read error.')
-    else:
-        filehandler.close_database(cursor, conn)
+        try:
+            columns = cursor.fetchall()
+        except:
+            raise IndexError('DATABASE: Read error.')
 
     competitor = rating.Competitor()
 
@@ -182,25 +205,64 @@ def write_competitor(competitor, file=ratings_db):
     file : float
         file path to .db file
     """
-    try:
-        (cursor, conn) = filehandler.open_database(file)
-    except FileNotFoundError:
-        raise FileNotFoundError
-    except sqlite3.InterfaceError:
-        raise FileNotFoundError
+    write_competitors([competitor], file=file)
+
+
+def competitor_rows(competitors):
+    """
+    Rating entries of a match's results, in the column order of write_rows
 
-    cursor = conn.cursor()
+    Parameters
+    -------
+    competitors : list
+        list of rating.Competitor
+
+    Returns
+    -------
+    rows : list
+        one tuple per competitor
+    """
+    return [tuple([competitor.first, competitor.last, competitor.member, competitor.match_type, competitor.division,
+                   competitor.rating, competitor.last_change, competitor.uncertainty, competitor.performance,
+                   competitor.number_of_matches, competitor.percent, competitor.match_id, competitor.match_name,
+                   competitor.club, competitor.club_code, competitor.match_date, competitor.match_date_unix,
+                   competitor.member.upper() if competitor.member is not None else None])
+            for competitor in competitors]
+
+
+def write_rows(rows, file=ratings_db):
+    """
+    Writes rating entries to the database in a single transaction. If any row fails, none are written.
+
+    Parameters
+    -------
+    rows : list
+        rating entries, see competitor_rows
+    file : str
+        file path to .db file
+    """
+    schema.ensure(file)
     sql = '''INSERT INTO ratings(first,last,uspsa_number,match_type,division,rating,last_change,uncertainty,performance,
-                                 match_count,percent,match_id,match_name,club,club_code,match_date,match_date_unix)
-             VALUES(?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)'''
-    line = tuple([competitor.first, competitor.last, competitor.member, competitor.match_type, competitor.division,
-                  competitor.rating, competitor.last_change, competitor.uncertainty, competitor.performance,
-                  competitor.number_of_matches, competitor.percent, competitor.match_id, competitor.match_name,
-                  competitor.club, competitor.club_code, competitor.match_date, competitor.match_date_unix])
-    cursor.execute(sql, line)
-    conn.commit()
+                                 match_count,percent,match_id,match_name,club,club_code,match_date,match_date_unix,
+                                 member_key)
+             VALUES(?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)'''
+    with filehandler.database(file) as cursor:
+        cursor.executemany(sql, rows)
 
-    filehandler.close_database(cursor, conn)
+
+def write_competitors(competitors, file=ratings_db):
+    """
+    Writes a match's results to the database as new entries in a single transaction. If any row fails, none of the
+    match is written.
+
+    Parameters
+    -------
+    competitors : list
+        list of rating.Competitor
+    file : str
+        file path to .db file
+    """
+    write_rows(competitor_rows(competitors), file=file)
 
 
 def get_classifier_codes(file=classifiers_db):
@@ -212,24 +274,15 @@ def get_classifier_codes(file=classifiers_db):
     file : float
         file path to .db file
     """
-    try:
-        (cursor, conn) = filehandler.open_database(file)
-    except FileNotFoundError:
-        raise FileNotFoundError
-    except sqlite3.InterfaceError:
-        raise FileNotFoundError
+    with filehandler.database(file) as cursor:
+        sql = '''SELECT DISTINCT classifier_code FROM match_scores
+                 ORDER BY classifier_code ASC'''
+        cursor.execute(sql, )
 
-    sql = '''SELECT DISTINCT classifier_code FROM match_scores
-             ORDER BY classifier_code ASC'''
-    cursor.execute(sql, )
-
-    try:
-        data = cursor.fetchall()
-    except:
-        filehandler.close_database(cursor, conn)
-        raise IndexError('DATABASE: Read error.')
-
-    filehandler.close_database(cursor, conn)
+        try:
+            data = cursor.fetchall()
+        except:
+            raise IndexError('DATABASE: Read error.')
     return data
 
 
@@ -251,94 +304,62 @@ def get_classifier_scores(code, division, file=classifiers_db):
     data : list
         list of classifier scores [(member_number, hitfactor, date_unix)]
     """
-    try:
-        (cursor, conn) = filehandler.open_database(file)
-    except FileNotFoundError:
-        raise FileNotFoundError
-    except sqlite3.InterfaceError:
-        raise FileNotFoundError
-
-    sql = '''SELECT member_number, hitfactor, date_unix FROM match_scores
-             WHERE classifier_code=? AND division=?
-             ORDER BY date_unix ASC
-             LIMIT 10'''
-    cursor.execute(sql, (code, division))
-
-    try:
-        data = cursor.fetchall()
-    except:
-        filehandler.close_database(cursor, conn)
-        raise IndexError('DATABASE: Read error.')
+    with filehandler.database(file) as cursor:
+        sql = '''SELECT member_number, hitfactor, date_unix FROM match_scores
+                 WHERE classifier_code=? AND division=?
+                 ORDER BY date_unix ASC
+                 LIMIT 10'''
+        cursor.execute(sql, (code, division))
 
-    filehandler.close_database(cursor, conn)
+        try:
+            data = cursor.fetchall()
+        except:
+            raise IndexError('DATABASE: Read error.')
     return data
 
 
 def get_unique_competitors(division='Carry Optics', file=ratings_db):
-    try:
-        (cursor, conn) = filehandler.open_database(file)
-    except FileNotFoundError:
-        raise FileNotFoundError
-    except sqlite3.InterfaceError:
-        raise FileNotFoundError
+    schema.ensure(file)
+    with filehandler.database(file) as cursor:
+        sql = '''SELECT DISTINCT member_key FROM current_ratings
+                 WHERE division=?'''
+        cursor.execute(sql, (division, ))
 
-    sql = '''SELECT DISTINCT uspsa_number FROM ratings
-             WHERE division=?'''
-    cursor.execute(sql, (division, ))
-
-    try:
-        data = cursor.fetchall()
-    except:
-        filehandler.close_database(cursor, conn)
-        raise IndexError('DATABASE: Read error.')
-
-    filehandler.close_database(cursor, conn)
+        try:
+            data = cursor.fetchall()
+        except:
+            raise IndexError('DATABASE: Read error.')
     return data
 
 
 def get_competitor_history(member, division='Carry Optics', file=ratings_db):
-    try:
-        (cursor, conn) = filehandler.open_database(file)
-    except FileNotFoundError:
-        raise FileNotFoundError
-    except sqlite3.InterfaceError:
-        raise FileNotFoundError
-
-    sql = '''SELECT first, last, rating, uncertainty, performance, match_date_unix FROM ratings
-             WHERE uspsa_number=? AND division=?'''
-    cursor.execute(sql, (member, division))
-
-    try:
-        data = cursor.fetchall()
-    except:
-        filehandler.close_database(cursor, conn)
-        raise IndexError('DATABASE: Read error.')
+    schema.ensure(file)
+    with filehandler.database(file) as cursor:
+        sql = '''SELECT first, last, rating, uncertainty, performance, match_date_unix FROM ratings
+                 WHERE member_key=? AND division=?'''
+        cursor.execute(sql, (member.upper(), division))
 
-    filehandler.close_database(cursor, conn)
+        try:
+            data = cursor.fetchall()
+        except:
+            raise IndexError('DATABASE: Read error.')
     return data
 
 
 def get_competitor_current(member, division='Carry Optics', min_matches=3, file=ratings_db):
-    try:
-        (cursor, conn) = filehandler.open_database(file)
-    except FileNotFoundError:
-        raise FileNotFoundError
-    except sqlite3.InterfaceError:
-        raise FileNotFoundError
-
-    sql = '''SELECT first, last, rating, last_change, uncertainty, performance, match_date_unix, match_count FROM ratings
-             WHERE uspsa_number=? AND division=?
-             ORDER BY match_date_unix DESC
-             LIMIT 1'''
-    cursor.execute(sql, (member, division))
-
-    try:
-        data = cursor.fetchall()
-    except:
-        filehandler.close_database(cursor, conn)
-        raise IndexError('DATABASE: Read error.')
+    schema.ensure(file)
+    with filehandler.database(file) as cursor:
+        sql = '''SELECT first, last, rating, last_change, uncertainty, performance, match_date_unix, match_count
+                 FROM current_ratings
+                 WHERE member_key=? AND division=?
+                 ORDER BY match_date_unix DESC
+                 LIMIT 1'''
+        cursor.execute(sql, (member.upper(), division))
 
-    filehandler.close_database(cursor, conn)
+        try:
+            data = cursor.fetchall()
+        except:
+            raise IndexError('DATABASE: Read error.')
 
     if data[0][7] <= min_matches:
         return None
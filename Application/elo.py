@@ -1,9 +1,9 @@
 import numpy as np
 
 
-def expected_scores(ratings, scale=1000):
+def pairwise_expected(ratings, scale=1000, chunk_size=None):
     """
-    Expected scores of all competitors
+    Sum of each competitor's expected scores against every other competitor, 1 / (1 + 10 ** ((Rb - Ra) / D))
 
     Parameters
     ----------
@@ -11,37 +11,59 @@ def expected_scores(ratings, scale=1000):
         Competitors' pre-match ratings
     scale : real number
         Distribution scale factor
+    chunk_size : int
+        number of competitors per block of the N x N expectation matrix, None builds it at once
 
     Returns
     -------
     expected : ndarray
-        Expect scores as a fraction of all scores
+        Sum of expected scores
     """
-
-    def expected_score(Ra, Rb, D):
-        return 1 / (1 + 10 ** ((Rb - Ra) / D))
-
+    ratings = np.asarray(ratings, dtype=float)
     N = len(ratings)
-    expected = np.zeros(N)
-    for i in range(0, N):
-        for j in range(0, N):
-            if i != j:
-                expected[i] += expected_score(ratings[i], ratings[j], D=scale) / (N * (N - 1) / 2)
+    if chunk_size is None:
+        chunk_size = max(N, 1)
 
+    expected = np.zeros(N)
+    with np.errstate(over='ignore'):
+        for start in range(0, N, chunk_size):
+            rows = np.arange(start, min(start + chunk_size, N))
+            block = 1 / (1 + 10 ** ((ratings[np.newaxis, :] - ratings[rows, np.newaxis]) / scale))
+            block[np.arange(len(rows)), rows] = 0
+            expected[rows] = np.sum(block, axis=1)
     return expected
 
 
-def expected2(ratings, scale=1000):
-    def expected_score(Ra, Rb, D):
-        return 2 / (1 + 10 ** ((Rb - Ra) / D))
+def expected_scores(ratings, scale=1000, chunk_size=None):
+    """
+    Expected scores of all competitors
+
+    Parameters
+    ----------
+    ratings : array like
+        Competitors' pre-match ratings
+    scale : real number
+        Distribution scale factor
+    chunk_size : int
+        number of competitors per block of the N x N expectation matrix, None builds it at once
+
+    Returns
+    -------
+    expected : ndarray
+        Expect scores as a fraction of all scores
+    """
 
     N = len(ratings)
-    expected = np.zeros(N)
-    for i in range(N):
-        for j in range(N):
-            if i != j:
-                expected[i] += expected_score(ratings[i], ratings[j], D=scale) / (N * (N - 1))
-    return expected
+    if N < 2:
+        return np.zeros(N)
+    return pairwise_expected(ratings, scale=scale, chunk_size=chunk_size) / (N * (N - 1) / 2)
+
+
+def expected2(ratings, scale=1000, chunk_size=None):
+    N = len(ratings)
+    if N < 2:
+        return np.zeros(N)
+    return 2 * pairwise_expected(ratings, scale=scale, chunk_size=chunk_size) / (N * (N - 1))
 
 
 def scores_normalized(scores, method='floor'):
@@ -62,18 +84,15 @@ def scores_normalized(scores, method='floor'):
         Normalized scores as a fraction of all scores
     """
 
+    scores = np.asarray(scores, dtype=float)
     if method == 'floor':
-        N = len(scores)
-        normal = np.zeros(N)
         scores = scores - np.min(scores)
-        for i in range(0, N):
-            normal[i] = scores[i] / np.sum(scores)
-        return normal
+        return scores / np.sum(scores)
     if method == 'percent':
         return scores / np.max(scores)
 
 
-def rating_adjustment(ratings, scores, k=20, scale=1000, min_rating=100):
+def rating_adjustment(ratings, scores, k=20, scale=1000, min_rating=100, chunk_size=None):
     """
     Expected scores of all competitors
 
@@ -89,6 +108,8 @@ def rating_adjustment(ratings, scores, k=20, scale=1000, min_rating=100):
         Distribution scale factor
     min_rating : int
         Minimum rating a competitor can have
+    chunk_size : int
+        number of competitors per block of the N x N expectation matrix, None builds it at once
 
     Returns
     -------
@@ -98,24 +119,101 @@ def rating_adjustment(ratings, scores, k=20, scale=1000, min_rating=100):
 
     if len(ratings) != len(scores):
         raise ValueError("The length of 'ratings' and 'scores' are not the same.")
-    if isinstance(k, int) or isinstance(k, float):
-        k = np.ones(len(ratings)) * k
 
-    def adjust(Ra, Ea, Sa, K, N):
-        return Ra + K * (N - 1) * (Sa - Ea)
-
-    expected = expected2(ratings, scale=scale)
+    ratings = np.asarray(ratings, dtype=float)
+    N = len(ratings)
+    expected = expected2(ratings, scale=scale, chunk_size=chunk_size)
     scores_norm = scores_normalized(scores, method='floor')
 
-    N = len(ratings)
-    ratings_new = np.zeros(N)
-    for i in range(0, N):
-        ratings_new[i] = adjust(ratings[i], expected[i], scores_norm[i], k[i], N)
-
-    for i in range(N):
-        if ratings_new[i] < 100:
-            ratings_new[i] = 100
-    return np.round(ratings_new, 0)
+    ratings_new = ratings + np.asarray(k) * (N - 1) * (scores_norm - expected)
+    return np.round(np.maximum(ratings_new, min_rating), 0)
+
+
+def pack_matches(matches):
+    """
+    Packs the arrays of many matches into one array with CSR-style offsets
+
+    Parameters
+    ----------
+    matches : list
+        one array like per match
+
+    Returns
+    -------
+    values : ndarray
+        all matches' values back to back
+    offsets : ndarray
+        match i is values[offsets[i]:offsets[i + 1]]
+    """
+    sizes = [len(match) for match in matches]
+    offsets = np.concatenate(([0], np.cumsum(sizes))).astype(int)
+    values = np.concatenate([np.asarray(match, dtype=float) for match in matches]) if matches else np.zeros(0)
+    return values, offsets
+
+
+def unpack_matches(values, offsets):
+    """
+    Splits packed values back into one array per match, see pack_matches
+    """
+    return np.split(np.asarray(values), offsets[1:-1])
+
+
+def rating_adjustment_batch(ratings, scores, offsets, k=20, scale=1000, min_rating=100, max_pairs=2 ** 22):
+    """
+    Adjusted ratings of many independent matches at once, same result as rating_adjustment on every match
+
+    Parameters
+    ----------
+    ratings : array like
+        All matches' pre-match ratings, packed (see pack_matches)
+    scores : array like
+        All matches' scores, packed
+    offsets : array like
+        match i is ratings[offsets[i]:offsets[i + 1]]
+    k : array like
+        k-factor, one for all or one per competitor, packed
+    scale : real number
+        Distribution scale factor
+    min_rating : int
+        Minimum rating a competitor can have
+    max_pairs : int
+        maximum number of competitor pairs evaluated at once, bounds memory
+
+    Returns
+    -------
+    ratings_new : ndarray
+        Adjusted ratings, packed
+    """
+    ratings, scores = np.asarray(ratings, dtype=float), np.asarray(scores, dtype=float)
+    offsets = np.asarray(offsets, dtype=int)
+    if len(ratings) != len(scores) or len(ratings) != offsets[-1]:
+        raise ValueError("The length of 'ratings', 'scores' and 'offsets' do not agree.")
+
+    sizes = np.diff(offsets)
+    match = np.repeat(np.arange(len(sizes)), sizes)
+    N = sizes[match]
+
+    # expected scores, matches of equal size are stacked into one (matches x N x N) block
+    expected = np.zeros(len(ratings))
+    with np.errstate(over='ignore'):
+        for n in np.unique(sizes[sizes > 1]):
+            same = np.nonzero(sizes == n)[0]
+            step = max(max_pairs // (n * n), 1)
+            for block in range(0, len(same), step):
+                index = offsets[same[block:block + step], np.newaxis] + np.arange(n)
+                R = ratings[index]
+                e = 1 / (1 + 10 ** ((R[:, np.newaxis, :] - R[:, :, np.newaxis]) / scale))
+                e[:, np.arange(n), np.arange(n)] = 0
+                expected[index] = 2 * np.sum(e, axis=2) / (n * (n - 1))
+
+    # floor normalized scores
+    starts = offsets[:-1][sizes > 0]
+    segment = np.cumsum(sizes > 0)[match] - 1
+    floor = scores - np.minimum.reduceat(scores, starts)[segment]
+    scores_norm = floor / np.add.reduceat(floor, starts)[segment]
+
+    ratings_new = ratings + np.asarray(k) * (N - 1) * (scores_norm - expected)
+    return np.round(np.maximum(ratings_new, min_rating), 0)
 
 
 # def performance_rating(ratings, scores, scale=400):
@@ -3,7 +3,7 @@ from config import *
 # by Ebtekar, A. and Liu, P.
 
 
-def pdf(x, mean, scale, method='normal'):
+def pdf(x, mean, scale, method='normal', out=None):
     """
     Standard normal distribution probability density function
 
@@ -18,19 +18,108 @@ def pdf(x, mean, scale, method='normal'):
     method : str
         normal: Gaussian distribution
         logistic: logistic distribution
+    out : ndarray
+        buffer for the result, shaped like the broadcast of x, mean and scale
 
     Returns
     -------
     pdf : ndarray
         Probability density function
     """
+    return np.exp(log_pdf(x, mean, scale, method=method, out=out), out=out)
 
+
+def _difference(x, mean, scale, out=None):
+    """
+    x - mean as a float array shaped like the broadcast of x, mean and scale, written to out when given
+    """
+    if out is None:
+        out = np.empty(np.broadcast_shapes(np.shape(x), np.shape(mean), np.shape(scale)))
+    return np.subtract(x, mean, out=out)
+
+
+def _linear_tail(out, x, edge, y, m, mask):
+    """
+    Writes the linear tail m * (x - edge) + y into out where mask is set, leaving the rest of out as it is
+    """
+    np.subtract(x, edge, out=out, where=mask)
+    np.multiply(out, m, out=out, where=mask)
+    np.add(out, y, out=out, where=mask)
+
+
+def log_pdf(x, mean, scale, method='normal', out=None):
+    """
+    Natural log of the probability density function, finite for any deviation from the mean
+
+    Parameters
+    ----------
+    x : array like
+        x value
+    mean : float
+        mean
+    scale : float
+        standard deviation
+    method : str
+        normal: Gaussian distribution
+        logistic: logistic distribution
+    out : ndarray
+        buffer for the result, shaped like the broadcast of x, mean and scale
+
+    Returns
+    -------
+    log_pdf : ndarray
+        log of the probability density function
+    """
+    out = _difference(x, mean, scale, out)
     if method == 'logistic':
+        # log(const * sech(u)) with sech(u) = 2 exp(-|u|) / (1 + exp(-2|u|))
         d = np.sqrt(3) / np.pi * scale
-        const = 0.25 / d
-        sech = 2 * np.exp((x - mean) / (scale * np.sqrt(2))) / (np.exp(2 * (x - mean) / (scale * np.sqrt(2))) + 1)
-        return const * sech
-    return 1 / (scale * np.sqrt(2 * np.pi)) * np.exp(-0.5 * ((x - mean) / scale) ** 2)
+        np.abs(out, out=out)
+        out /= scale * np.sqrt(2)
+        out += np.log1p(np.exp(-2 * out))
+        np.negative(out, out=out)
+        out += np.log(0.5 / d)
+        return out[()]
+    out /= scale
+    np.square(out, out=out)
+    out *= -0.5
+    out -= np.log(scale * np.sqrt(2 * np.pi))
+    return out[()]
+
+
+def log_pdf_prime(x, mean, scale, method='normal'):
+    """
+    First derivative of log_pdf
+
+    Parameters
+    ----------
+    x : array like
+        x value
+    mean : float
+        mean
+    scale : float
+        standard deviation
+    method : str
+        normal: Gaussian distribution
+        logistic: logistic distribution
+
+    Returns
+    -------
+    log_pdf_prime : ndarray
+        Derivative of the log of the probability density function
+    """
+    if method == 'logistic':
+        return - np.tanh((x - mean) / (scale * np.sqrt(2))) / (scale * np.sqrt(2))
+    return - (x - mean) / scale ** 2
+
+
+def log_pdf_prime2(x, mean, scale, method='normal'):
+    """
+    Second derivative of log_pdf, see log_pdf_prime
+    """
+    if method == 'logistic':
+        return - (1 - np.tanh((x - mean) / (scale * np.sqrt(2))) ** 2) / (2 * scale ** 2)
+    return - 1 / scale ** 2 * np.ones_like(x - mean, dtype=float)
 
 
 def pdf_prime(x, mean, scale, method='normal'):
@@ -85,7 +174,70 @@ def cdf(x, mean, scale, method='normal'):
     if method == 'logistic':
         d = np.sqrt(3) / np.pi * scale
         return 0.5 * (1 + np.tanh((x - mean) / (2 * d)))
-    return 0.5 * (1 + sp.special.erf((x - mean) / (scale * np.sqrt(2))))
+    return sp.special.ndtr((x - mean) / scale)
+
+
+def log_cdf(x, mean, scale, method='normal', out=None):
+    """
+    Natural log of the cumulative distribution function, accurate far into the lower tail
+
+    Parameters
+    ----------
+    x : array like
+        x value
+    mean : float
+        mean
+    scale : float
+        standard deviation
+    method : str
+        normal: Gaussian distribution
+        logistic: logistic distribution
+    out : ndarray
+        buffer for the result, shaped like the broadcast of x, mean and scale
+
+    Returns
+    -------
+    log_cdf : ndarray
+        log of the cumulative density function
+    """
+    out = _difference(x, mean, scale, out)
+    if method == 'logistic':
+        # log(0.5 * (1 + tanh(v))) = -log(1 + exp(-2v))
+        d = np.sqrt(3) / np.pi * scale
+        out /= -d
+        np.logaddexp(0, out, out=out)
+        np.negative(out, out=out)
+        return out[()]
+    out /= scale
+    return sp.special.log_ndtr(out, out=out)[()]
+
+
+def normal_posterior(mean1, scale1, mean2, scale2):
+    """
+    Product of two normal distributions, the precision weighted mean and standard deviation
+
+    Parameters
+    ----------
+    mean1 : array like
+        mean of the first distribution
+    scale1 : array like
+        standard deviation of the first distribution
+    mean2 : array like
+        mean of the second distribution
+    scale2 : array like
+        standard deviation of the second distribution
+
+    Returns
+    -------
+    mean : ndarray
+        posterior mean (and mode)
+    scale : ndarray
+        posterior standard deviation
+    """
+
+    precision1, precision2 = 1 / scale1 ** 2, 1 / scale2 ** 2
+    precision = precision1 + precision2
+    return (mean1 * precision1 + mean2 * precision2) / precision, 1 / np.sqrt(precision)
 
 
 def logistic(x, mean=0, scale=percent_factor):
@@ -131,7 +283,92 @@ def cdf_normal_inverse(percentile, mean, std):
     return sp.stats.norm.ppf(percentile, loc=mean, scale=std)
 
 
-def loss_distribution(x, mean, scale, method='normal'):
+def loss_linear_region(mean, scale, method='normal'):
+    """
+    Linear tail of the loss distribution beyond two standard deviations above the mean
+
+    Parameters
+    ----------
+    mean : array like
+        mean
+    scale : array like
+        standard deviation
+    method : str
+        normal: Gaussian distribution
+        logistic: logistic distribution
+
+    Returns
+    -------
+    edge : ndarray
+        start of the linear region
+    y : ndarray
+        loss distribution at the edge
+    m : ndarray
+        slope of the linear region
+    """
+    edge = mean + 2 * scale
+    y1 = pdf(edge - 10, mean, scale, method=method) / (- cdf(-(edge - 10), -mean, scale, method=method))
+    y2 = pdf(edge, mean, scale, method=method) / (- cdf(-edge, -mean, scale, method=method))
+    return edge, y2, (y2 - y1) / 10
+
+
+def win_linear_region(mean, scale, method='normal'):
+    """
+    Linear tail of the win distribution beyond two standard deviations below the mean
+
+    Parameters
+    ----------
+    mean : array like
+        mean
+    scale : array like
+        standard deviation
+    method : str
+        normal: Gaussian distribution
+        logistic: logistic distribution
+
+    Returns
+    -------
+    edge : ndarray
+        start of the linear region
+    y : ndarray
+        win distribution at the edge
+    m : ndarray
+        slope of the linear region
+    """
+    edge = mean - 2 * scale
+    y1 = pdf(edge + 10, mean, scale, method=method) / (cdf(edge + 10, mean, scale, method=method))
+    y2 = pdf(edge, mean, scale, method=method) / (cdf(edge, mean, scale, method=method))
+    return edge, y2, (y2 - y1) / 10
+
+
+def _logistic_ratio(x, mean, scale, sign, out=None, scratch=None):
+    """
+    Logistic pdf / cdf (sign=-1) or pdf / (1 - cdf) (sign=1) from two exponentials,
+    0.5 / d * (exp(-a) + exp(-a + sign * b)) / (1 + exp(-2a)) with a = |x - mean| / (scale sqrt(2)), b = (x - mean) / d.
+    The exponent is capped where the ratio is far inside the linear tail, so it never overflows. a is kept in scratch
+    when given.
+    """
+    d = np.sqrt(3) / np.pi * scale
+    out = _difference(x, mean, scale, out)
+    if scratch is None:
+        scratch = np.empty_like(out)
+    a = np.abs(out, out=scratch)
+    a /= scale * np.sqrt(2)
+    out /= d / sign
+    out -= a
+    np.minimum(out, 700, out=out)
+    np.exp(out, out=out)
+    np.negative(a, out=a)
+    np.exp(a, out=a)
+    out += a
+    np.square(a, out=a)
+    a += 1
+    out /= a
+    out *= 0.5 / d
+    return out
+
+
+def loss_distribution(x, mean, scale, method='normal', out=None, scratch=None):
     """
     Loss distribution
 
@@ -139,29 +376,120 @@ def loss_distribution(x, mean, scale, method='normal'):
     ----------
     x : array like
         x value
-    mean : float
-        mean
-    scale : float
-        standard deviation
+    mean : array like
+        mean, broadcast against x
+    scale : array like
+        standard deviation, broadcast against x
     method : str
         normal: Gaussian distribution
         logistic: logistic distribution
+    out : ndarray
+        buffer for the result, shaped like the broadcast of x, mean and scale
+    scratch : ndarray
+        buffer shaped like out for the intermediate values of the logistic method
 
     Returns
     -------
     loss : ndarray
         Probability density function
     """
-    def linear_region(val, mu=mean, k=scale):
-        y1 = pdf(mu + 2 * scale - 10, mu, k, method=method) / (- cdf(-(mu + 2 * k - 10), -mu, k, method=method))
-        y2 = pdf(mu + 2 * scale, mu, k, method=method) / (- cdf(-(mu + 2 * k), -mu, k, method=method))
-        m = (y2 - y1) / 10
-        return m * (val - (mu + 2 * scale)) + y2
+    x, mean, scale = np.asarray(x, dtype=float), np.asarray(mean, dtype=float), np.asarray(scale, dtype=float)
+    edge, y2, m = loss_linear_region(mean, scale, method=method)
+
+    # curved region, -pdf / (1 - cdf) without forming the tail probability
+    if method == 'logistic':
+        out = _logistic_ratio(x, mean, scale, 1, out, scratch)
+        np.negative(out, out=out)
+    else:
+        out = _difference(x, mean, scale, out)
+        out /= scale * np.sqrt(2)
+        sp.special.erfcx(out, out=out)
+        np.divide(- np.sqrt(2 / np.pi) / scale, out, out=out)
+
+    # linear region
+    _linear_tail(out, x, edge, y2, m, x > edge)
+    return out[()]
+
+
+def loss_distribution_prime(x, mean, scale, method='normal', loss=None):
+    """
+    First derivative of the loss distribution
+
+    Parameters
+    ----------
+    x : array like
+        x value
+    mean : array like
+        mean, broadcast against x
+    scale : array like
+        standard deviation, broadcast against x
+    method : str
+        normal: Gaussian distribution
+        logistic: logistic distribution
+    loss : ndarray
+        loss_distribution at x, computed when None
+
+    Returns
+    -------
+    loss_prime : ndarray
+        Derivative of the loss distribution
+    """
+    x, mean, scale = np.asarray(x, dtype=float), np.asarray(mean, dtype=float), np.asarray(scale, dtype=float)
+    edge, y2, m = loss_linear_region(mean, scale, method=method)
+    if loss is None:
+        loss = loss_distribution(x, mean, scale, method=method)
+
+    # quotient rule with pdf' / pdf and cdf' / (1 - cdf) written in terms of the loss distribution itself
+    if method == 'logistic':
+        d = np.sqrt(3) / np.pi * scale
+        curved = - loss * (np.tanh((x - mean) / (scale * np.sqrt(2))) / (scale * np.sqrt(2)) -
+                           cdf(x, mean, scale, method=method) / d)
+    else:
+        curved = - loss * ((x - mean) / scale ** 2 + loss)
+    return np.where(x <= edge, curved, m)
+
+
+def loss_distribution_prime2(x, mean, scale, method='normal', loss=None, loss_prime=None):
+    """
+    Second derivative of the loss distribution
 
-    def curved_region(val, mu=mean, k=scale):
-        return pdf(val, mu, k, method=method) / (- cdf(-val, -mean, k, method=method))
+    Parameters
+    ----------
+    x : array like
+        x value
+    mean : array like
+        mean, broadcast against x
+    scale : array like
+        standard deviation, broadcast against x
+    method : str
+        normal: Gaussian distribution
+        logistic: logistic distribution
+    loss : ndarray
+        loss_distribution at x, computed when None
+    loss_prime : ndarray
+        loss_distribution_prime at x, computed when None
 
-    return np.piecewise(x, [x <= mean + 2 * scale, x > mean + 2 * scale], [curved_region, linear_region])
+    Returns
+    -------
+    loss_prime2 : ndarray
+        Second derivative of the loss distribution
+    """
+    x, mean, scale = np.asarray(x, dtype=float), np.asarray(mean, dtype=float), np.asarray(scale, dtype=float)
+    edge = loss_linear_region(mean, scale, method=method)[0]
+    if loss is None:
+        loss = loss_distribution(x, mean, scale, method=method)
+    if loss_prime is None:
+        loss_prime = loss_distribution_prime(x, mean, scale, method=method, loss=loss)
+
+    # product rule on loss_distribution_prime
+    if method == 'logistic':
+        d = np.sqrt(3) / np.pi * scale
+        t, c = np.tanh((x - mean) / (scale * np.sqrt(2))), cdf(x, mean, scale, method=method)
+        curved = - loss_prime * (t / (scale * np.sqrt(2)) - c / d) - \
+            loss * ((1 - t ** 2) / (2 * scale ** 2) - c * (1 - c) / d ** 2)
+    else:
+        curved = - loss_prime * ((x - mean) / scale ** 2 + loss) - loss * (1 / scale ** 2 + loss_prime)
+    return np.where(x <= edge, curved, 0)
 
 
 def draw_distribution(x, mean, scale, method='logistic'):
@@ -189,7 +517,7 @@ def draw_distribution(x, mean, scale, method='logistic'):
     return np.divide(pdf_prime(x, mean, scale, method=method), pdf(x, mean, scale, method=method))
 
 
-def win_distribution(x, mean, scale, method='normal'):
+def win_distribution(x, mean, scale, method='normal', out=None, scratch=None):
     """
     Win distribution
 
@@ -197,29 +525,205 @@ def win_distribution(x, mean, scale, method='normal'):
     ----------
     x : array like
         x value
-    mean : float
-        mean
-    scale : float
-        standard deviation
+    mean : array like
+        mean, broadcast against x
+    scale : array like
+        standard deviation, broadcast against x
     method : str
         normal: Gaussian distribution
         logistic: logistic distribution
+    out : ndarray
+        buffer for the result, shaped like the broadcast of x, mean and scale
+    scratch : ndarray
+        buffer shaped like out for the intermediate values of the logistic method
 
     Returns
     -------
     win : ndarray
         Probability density function
     """
-    def linear_region(val, mu=mean, k=scale):
-        y1 = pdf(mu - 2 * scale + 10, mu, k, method=method) / (cdf(mu - 2 * k + 10, mu, k, method=method))
-        y2 = pdf(mu - 2 * scale, mu, k, method=method) / (cdf(mu - 2 * k, mu, k, method=method))
-        m = (y2 - y1) / 10
-        return m * (val - (mu - 2 * scale)) + y2
+    x, mean, scale = np.asarray(x, dtype=float), np.asarray(mean, dtype=float), np.asarray(scale, dtype=float)
+    edge, y2, m = win_linear_region(mean, scale, method=method)
+
+    # curved region, pdf / cdf without forming the tail probability
+    if method == 'logistic':
+        out = _logistic_ratio(x, mean, scale, -1, out, scratch)
+    else:
+        # pdf / cdf = sqrt(2 / pi) / (scale * erfcx(-z / sqrt(2)))
+        out = _difference(mean, x, scale, out)
+        out /= scale * np.sqrt(2)
+        sp.special.erfcx(out, out=out)
+        np.divide(np.sqrt(2 / np.pi) / scale, out, out=out)
 
-    def curved_region(val, mu=mean, k=scale):
-        return pdf(val, mu, k, method=method) / (cdf(val, mean, k, method=method))
+    # linear region
+    _linear_tail(out, x, edge, y2, m, x < edge)
+    return out[()]
 
-    return np.piecewise(x, [x < mean - 2 * scale, x >= mean - 2 * scale], [linear_region, curved_region])
+
+def win_distribution_prime(x, mean, scale, method='normal', win=None):
+    """
+    First derivative of the win distribution
+
+    Parameters
+    ----------
+    x : array like
+        x value
+    mean : array like
+        mean, broadcast against x
+    scale : array like
+        standard deviation, broadcast against x
+    method : str
+        normal: Gaussian distribution
+        logistic: logistic distribution
+    win : ndarray
+        win_distribution at x, computed when None
+
+    Returns
+    -------
+    win_prime : ndarray
+        Derivative of the win distribution
+    """
+    x, mean, scale = np.asarray(x, dtype=float), np.asarray(mean, dtype=float), np.asarray(scale, dtype=float)
+    edge, y2, m = win_linear_region(mean, scale, method=method)
+    if win is None:
+        win = win_distribution(x, mean, scale, method=method)
+
+    # quotient rule with pdf' / pdf and cdf' / cdf written in terms of the win distribution itself
+    if method == 'logistic':
+        d = np.sqrt(3) / np.pi * scale
+        curved = - win * (np.tanh((x - mean) / (scale * np.sqrt(2))) / (scale * np.sqrt(2)) +
+                          (1 - cdf(x, mean, scale, method=method)) / d)
+    else:
+        curved = - win * ((x - mean) / scale ** 2 + win)
+    return np.where(x < edge, m, curved)
+
+
+def win_distribution_prime2(x, mean, scale, method='normal', win=None, win_prime=None):
+    """
+    Second derivative of the win distribution
+
+    Parameters
+    ----------
+    x : array like
+        x value
+    mean : array like
+        mean, broadcast against x
+    scale : array like
+        standard deviation, broadcast against x
+    method : str
+        normal: Gaussian distribution
+        logistic: logistic distribution
+    win : ndarray
+        win_distribution at x, computed when None
+    win_prime : ndarray
+        win_distribution_prime at x, computed when None
+
+    Returns
+    -------
+    win_prime2 : ndarray
+        Second derivative of the win distribution
+    """
+    x, mean, scale = np.asarray(x, dtype=float), np.asarray(mean, dtype=float), np.asarray(scale, dtype=float)
+    edge = win_linear_region(mean, scale, method=method)[0]
+    if win is None:
+        win = win_distribution(x, mean, scale, method=method)
+    if win_prime is None:
+        win_prime = win_distribution_prime(x, mean, scale, method=method, win=win)
+
+    # product rule on win_distribution_prime
+    if method == 'logistic':
+        d = np.sqrt(3) / np.pi * scale
+        t, c = np.tanh((x - mean) / (scale * np.sqrt(2))), cdf(x, mean, scale, method=method)
+        curved = - win_prime * (t / (scale * np.sqrt(2)) + (1 - c) / d) - \
+            win * ((1 - t ** 2) / (2 * scale ** 2) - c * (1 - c) / d ** 2)
+    else:
+        curved = - win_prime * ((x - mean) / scale ** 2 + win) - win * (1 / scale ** 2 + win_prime)
+    return np.where(x < edge, 0, curved)
+
+
+# Win and loss curves of a zero mean opponent, {(distribution, scale, method, step, half width): curve}
+_templates = dict()
+
+
+def _template(distribution, scale, method, step, half):
+    key = (distribution.__name__, scale, method, step, half)
+    curve = _templates.get(key)
+    if curve is None:
+        curve = distribution(np.arange(-half, half + 1) * step, 0.0, scale, method=method)
+        _templates[key] = curve
+    return curve
+
+
+def template_distribution(distribution, x, mean, scale, method='normal', bucket=1):
+    """
+    Evaluates a win or loss distribution by shifting a precomputed zero mean curve. The curves depend on x - mean and
+    scale only, so for one scale every opponent's curve is a slice of the same template, interpolated linearly between
+    grid points for means that are not on the grid. Scales are rounded to the nearest bucket, and means too far
+    outside the grid for the template are computed directly.
+
+    Parameters
+    ----------
+    distribution : callable
+        win_distribution or loss_distribution
+    x : array like
+        evenly spaced x values
+    mean : array like
+        mean, a scalar or one value per row (N x 1)
+    scale : array like
+        standard deviation, a scalar or one value per row (N x 1)
+    method : str
+        normal: Gaussian distribution
+        logistic: logistic distribution
+    bucket : float
+        rounding of the scale
+
+    Returns
+    -------
+    curve : ndarray
+        distribution evaluated at x, shaped like distribution(x, mean, scale)
+    """
+    x = np.asarray(x, dtype=float)
+    mean, scale = np.asarray(mean, dtype=float), np.asarray(scale, dtype=float)
+    shape = np.broadcast_shapes(x.shape, mean.shape, scale.shape)
+    mean, scale = np.broadcast_arrays(mean, scale)
+    mean, scale = mean.reshape(-1), np.round(scale.reshape(-1) / bucket) * bucket
+
+    M = x.size
+    step = x[1] - x[0] if M > 1 else 1.0
+    half = 2 * M
+    out = np.empty((mean.size, M))
+    for s in np.unique(scale):
+        rows = np.nonzero(scale == s)[0]
+        windows = np.lib.stride_tricks.sliding_window_view(_template(distribution, s, method, step, half), M)
+
+        # template index of each row's first grid point
+        position = (x[0] - mean[rows]) / step + half
+        start = np.floor(position).astype(int)
+        fraction = position - start
+        inside = (start >= 0) & (start < len(windows) - 1)
+
+        start, fraction, inside_rows = start[inside], fraction[inside, np.newaxis], rows[inside]
+        out[inside_rows] = windows[start] + fraction * (windows[start + 1] - windows[start])
+        if not np.all(inside):
+            outside_rows = rows[~inside]
+            out[outside_rows] = distribution(x, mean[outside_rows, np.newaxis], s, method=method)
+    return out.reshape(shape)
+
+
+def win_distribution_template(x, mean, scale, method='normal', bucket=1):
+    """
+    Win distribution from shifted templates, drop-in for win_distribution on an evenly spaced grid, see
+    template_distribution
+    """
+    return template_distribution(win_distribution, x, mean, scale, method=method, bucket=bucket)
+
+
+def loss_distribution_template(x, mean, scale, method='normal', bucket=1):
+    """
+    Loss distribution from shifted templates, drop-in for loss_distribution on an evenly spaced grid, see
+    template_distribution
+    """
+    return template_distribution(loss_distribution, x, mean, scale, method=method, bucket=bucket)
 
 
 def weight(match_count, placement=noob_placement, min_weight=noob_weight):
@@ -251,3 +755,157 @@ def weight(match_count, placement=noob_placement, min_weight=noob_weight):
     w = linear(match_count, placement, min_weight)
     return w
 
+
+def _refine(func, low, high, f_low, f_high, rows, tol=1e-3, max_iter=50, step=None):
+    """
+    Bracketed Newton-Raphson iteration on every bracket, started at the secant point, see solve. With a step, a
+    bracket narrower than the step also stops and returns its lower end.
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        x = np.where(f_low == f_high, low, low - f_low * (high - low) / (f_high - f_low))
+
+    active = np.arange(x.size)
+    for _ in range(max_iter):
+        if active.size == 0:
+            break
+        f, f_prime = func(x[active], rows[active])
+        same = np.sign(f) == np.sign(f_low[active])
+        low[active] = np.where(same, x[active], low[active])
+        high[active] = np.where(same, high[active], x[active])
+        f_low[active] = np.where(same, f, f_low[active])
+        with np.errstate(divide='ignore', invalid='ignore'):
+            x_new = x[active] - f / f_prime
+        inside = (x_new > low[active]) & (x_new < high[active])
+        x_new = np.where(f == 0, x[active], np.where(inside, x_new, 0.5 * (low[active] + high[active])))
+        converged = np.abs(x_new - x[active]) < tol
+        if step is not None:
+            narrow = (high[active] - low[active] <= step) & ~converged
+            x_new = np.where(narrow, low[active], x_new)
+            converged |= narrow
+        x[active] = x_new
+        active = active[~converged]
+    return x
+
+
+def solve(func, lower, upper, size=1, scan=None, points=64, step=1, tol=1e-3, max_iter=50):
+    """
+    Bracketed Newton-Raphson roots of many problems that share one interval.
+
+    func is scanned at evenly spaced points on the grid with the given step, and every sign change is refined with
+    Newton steps that fall back to bisection when they leave the bracket. Roots closer together than the scan spacing
+    can be missed.
+
+    Parameters
+    ----------
+    func : callable
+        func(x, rows) returns func and its first derivative at x for problems rows, both 1-d arrays of equal length
+    lower : float
+        lower bound
+    upper : float
+        upper bound
+    size : int
+        number of problems
+    scan : callable
+        scan(x) returns func and its first derivative at shared points x for every problem (points x size), None
+        evaluates func
+    points : int
+        number of scan points
+    step : float
+        grid step
+    tol : float
+        absolute tolerance on x
+    max_iter : int
+        maximum number of Newton iterations
+
+    Returns
+    -------
+    x : ndarray
+        every root found
+    rows : ndarray
+        problem of each root
+    """
+    x_scan = lower + np.round(np.linspace(0, upper - lower, points) / step) * step
+    f_scan = _scan(func, scan, x_scan, size)[0]
+    k, rows = np.nonzero(np.sign(f_scan[:-1]) != np.sign(f_scan[1:]))
+    x = _refine(func, x_scan[k], x_scan[k + 1], f_scan[k, rows], f_scan[k + 1, rows], rows, tol, max_iter)
+    return x, rows
+
+
+def _scan(func, scan, x, size):
+    """
+    func and its first derivative at shared points x for every problem (points x size), from scan when it is given
+    """
+    if scan is not None:
+        return scan(x)
+    f, f_prime = func(np.repeat(x, size), np.tile(np.arange(size), x.size))
+    return f.reshape(x.size, size), f_prime.reshape(x.size, size)
+
+
+def grid_argmin(func, func_prime, lower, upper, size=1, scan=None, nodes=None, points=64, step=1):
+    """
+    Grid point with the smallest |func| for many problems that share one interval, without evaluating the whole grid.
+
+    func and its derivative are evaluated for every problem at shared grid points, evenly spaced ones plus those
+    around every node where func has a kink, so func is smooth between neighbouring points. Between two points more
+    than one step apart, a root of func, or a root of its derivative where |func| falls and then rises, is refined
+    with bracketed Newton steps to within one step and the grid points around it are evaluated too. |func| is
+    monotone between all of these points, so one of them has the smallest |func| on the grid, with ties going to the
+    lowest point like np.argmin. Roots closer together than the spacing of the shared points can be missed.
+
+    Parameters
+    ----------
+    func : callable
+        func(x, rows) returns func and its first derivative at x for problems rows, both 1-d arrays of equal length
+    func_prime : callable
+        func_prime(x, rows) returns the first and second derivatives of func, as func
+    lower : float
+        lower bound
+    upper : float
+        upper bound
+    size : int
+        number of problems
+    scan : callable
+        scan(x) returns func and its first derivative at shared points x for every problem (points x size), None
+        evaluates func
+    nodes : array like
+        points where func has a kink, shared by every problem
+    points : int
+        number of evenly spaced points
+    step : float
+        grid step
+
+    Returns
+    -------
+    x : ndarray
+        (size) grid point with the smallest |func| for each problem
+    """
+    x = [lower + np.round(np.linspace(0, upper - lower, points) / step) * step]
+    if nodes is not None:
+        nodes = (np.asarray(nodes, dtype=float).ravel() - lower) / step
+        x += [lower + (np.ceil(nodes) - 1) * step, lower + np.floor(nodes) * step,
+              lower + np.ceil(nodes) * step, lower + (np.floor(nodes) + 1) * step]
+    x = np.unique(np.clip(np.concatenate(x), lower, upper))
+    f, f_prime = _scan(func, scan, x, size)
+    best = np.argmin(np.abs(f), axis=0)
+
+    ## Roots of func, and of its derivative where |func| turns from falling to rising without func changing sign,
+    ## between shared points, each found to within one step
+    wide = (np.diff(x) > step)[:, np.newaxis]
+    change = np.sign(f[:-1]) != np.sign(f[1:])
+    turn = (np.sign(f[:-1]) * f_prime[:-1] < 0) & (np.sign(f[1:]) * f_prime[1:] > 0) & ~change
+    roots, rows = [], []
+    for g, g_x, bracket in ((func, f, change & wide), (func_prime, f_prime, turn & wide)):
+        k, r = np.nonzero(bracket)
+        roots.append(_refine(g, x[k], x[k + 1], g_x[k, r], g_x[k + 1, r], r, step=step))
+        rows.append(r)
+    below = lower + np.floor((np.concatenate(roots) - lower) / step) * step
+    rows = np.concatenate(rows * 3 + [np.arange(size)])
+    x = np.minimum(np.concatenate([below, below + step, below + 2 * step, x[best]]), upper)
+    score = np.abs(func(x[:-size], rows[:-size])[0]) if x.size > size else np.empty(0)
+    score = np.concatenate([score, np.abs(f[best, np.arange(size)])])
+
+    order = np.lexsort((x, score, rows))
+    rows, x = rows[order], x[order]
+    first = np.ones(rows.size, dtype=bool)
+    first[1:] = rows[1:] != rows[:-1]
+    return x[first]
@@ -0,0 +1,122 @@
+from config import *
+from Utilities import filehandler, practiscore as ps, matchindex
+from Application import database, rating, schema
+from Application.store import RatingStore
+import concurrent.futures
+
+
+def match_header(file, divisions=None):
+    """
+    Date, ID and divisions of a match, read without building its results
+
+    Parameters
+    ----------
+    file : str
+        file path to match .json file
+    divisions : list
+        division names to look for, None takes every division in the match, names are compared case-insensitively
+
+    Returns
+    -------
+    header : tuple
+        (match_date_unix, match_id, list of division names as spelled in the match)
+    """
+    data = filehandler.read_json(file)
+    found = ps.match_divisions(data)
+    if divisions is not None:
+        wanted = [division.lower() for division in divisions]
+        found = [division for division in found if division.lower() in wanted]
+    return data['unix'], data['practiscore_id'], found
+
+
+def rate_division(division, files, match_type='USPSA', file=ratings_db):
+    """
+    Loads and rates one division's matches in the given order with an in-memory store for that division. The
+    database is only read, the history rows are returned for the caller to write.
+
+    Parameters
+    ----------
+    division : str
+        division name
+    files : list
+        file paths to match .json files, oldest first
+    match_type : str
+        Match type
+    file : str
+        file path to .db file
+
+    Returns
+    -------
+    rows : list
+        rating entries of every match, see database.competitor_rows
+    """
+    with RatingStore(file=file, division=division, collect=True) as store:
+        for match in files:
+            scores = ps.competitors_from_data(ps.match_data(match), division, match_type)
+            for competitor in scores:
+                competitor.division = division
+            rating.rate_match(scores, division, match_type, store)
+    return store.rows
+
+
+def rate_all(files=None, divisions=None, match_type='USPSA', workers=rating_workers, file=ratings_db):
+    """
+    Rates every division of many matches. The divisions, which are independent rating pools, are loaded and rated in
+    parallel, each in chronological order, and this process writes the rows of each division as it finishes, so the
+    workers never write to the database.
+
+    Parameters
+    ----------
+    files : list
+        file paths to match .json files, None takes every indexed match
+    divisions : list
+        division names, None rates every division found, names are compared case-insensitively
+    match_type : str
+        Match type
+    workers : int
+        number of worker processes, 1 runs in this process
+    file : str
+        file path to .db file
+
+    Returns
+    -------
+    count : dict
+        {division: number of matches rated}
+    """
+    if files is None:
+        matchindex.update()
+        files = [match['file'] for match in matchindex.matches()]
+    schema.ensure(file)
+
+    serial = workers is None or workers <= 1
+    executor = None if serial else concurrent.futures.ProcessPoolExecutor(max_workers=workers)
+    try:
+        if serial:
+            headers = [match_header(match, divisions) for match in files]
+        else:
+            headers = list(executor.map(match_header, files, [divisions] * len(files), chunksize=8))
+
+        # one spelling per division, so every pool writes a single division name
+        names, pools = dict(), dict()
+        for (_, _, found), match in sorted(zip(headers, files), key=lambda pair: pair[0][0:2]):
+            for division in found:
+                pools.setdefault(names.setdefault(division.lower(), division), list()).append(match)
+
+        count = dict()
+        if serial:
+            for division, matches in pools.items():
+                database.write_rows(rate_division(division, matches, match_type, file), file=file)
+                count[division] = len(matches)
+        else:
+            futures = {executor.submit(rate_division, division, matches, match_type, file): division
+                       for division, matches in pools.items()}
+            for future in concurrent.futures.as_completed(futures):
+                database.write_rows(future.result(), file=file)
+                count[futures[future]] = len(pools[futures[future]])
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    for division, matches in count.items():
+        print(division + ':', matches, 'matches')
+    return count
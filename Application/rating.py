@@ -1,6 +1,7 @@
 from config import *
 from Utilities import practiscore as ps
 from Application import database, elommr as mmr
+from Application.curves import curve_cache
 import matplotlib.pyplot as plt
 
 
@@ -68,7 +69,7 @@ class Competitor:
         self.competitor_count = None
 
 
-def match_update(file, division='Carry Optics', match_type='USPSA'):
+def match_update(file, division='Carry Optics', match_type='USPSA', store=None):
     """
     Updates ratings with a given match
 
@@ -80,41 +81,66 @@ def match_update(file, division='Carry Optics', match_type='USPSA'):
         division name
     match_type : str
         Match type
+    store : store.RatingStore
+        in-memory rating state for replays, None reads and writes the database directly
     """
     # Get Scores from match
-    scores = ps.mmr_format(file, division)
+    scores = ps.mmr_format(file, division, match_type)
+    return rate_match(scores, division, match_type, store)
+
+
+def rate_match(scores, division='Carry Optics', match_type='USPSA', store=None):
+    """
+    Updates ratings with the results of one division of a match
+
+    Parameters
+    ----------
+    scores : list
+        list of Competitors at match, see practiscore.competitors_from_data
+    division : str
+        division name
+    match_type : str
+        Match type
+    store : store.RatingStore
+        in-memory rating state for replays, None reads and writes the database directly
+    """
+    source = database if store is None else store
     competitor_count = len(scores)
+    if competitor_count == 0:
+        return scores
 
     # Sort win/loss rankings
     scores = win_loss_ranking(scores)
 
+    ratings = source.get_ratings_bulk([competitor.member for competitor in scores], division, match_type)
     noobs = False
     for i in range(len(scores)):
-        scores[i] = database.get_competitor_rating(scores[i])
+        member = scores[i].member.upper() if scores[i].member is not None else None
+        scores[i] = database.assign_rating(scores[i], ratings.get(member))
         if scores[i].noob is True:
             noobs = True
 
     ## Determine Performance Ratings
-    scores = performance_rating(scores, method=mmr_method)
+    scores = performance_rating(scores, method=mmr_method, solver=mmr_solver)
 
     ## If a noob is in the match, assign performance rating to noob and redo the performance ratings
     if noobs is True:
         # for competitor in scores:
             # if competitor.noob is True:
             #     competitor.rating = competitor.performance
-        scores = performance_rating(scores, method=mmr_method)
+        scores = performance_rating(scores, method=mmr_method, solver=mmr_solver)
 
     ## Update Skill Ratings and uncertainties
     u_match = match_uncertainty(scores)  # uncertainty for the match
     for i in range(len(scores)):
         scores[i] = new_rating(scores[i], u_match, scores[i].stage_count, competitor_count)
-    # scores = new_uncertainty(scores, u_match)
+    scores = new_uncertainty(scores, u_match, method=mmr_method)
 
     ## Write to database
-    for competitor in scores:
-        if competitor.member is not None:
-            competitor.number_of_matches += 1
-            database.write_competitor(competitor)
+    members = [competitor for competitor in scores if competitor.member is not None]
+    for competitor in members:
+        competitor.number_of_matches += 1
+    source.write_competitors(members)
     return scores
 
 
@@ -145,7 +171,43 @@ def win_loss_ranking(scores):
     return scores
 
 
-def performance_rating(scores, min_rating=rating_min, max_rating=rating_max, method='normal', plot=False):
+def opponent_coefficients(scores):
+    """
+    Weights of every opponent's win and loss distributions in each competitor's performance function,
+    Q_i = sum_j A_ij * win_j + B_ij * loss_j
+
+    Parameters
+    ----------
+    scores : list
+        list of Competitors at match with win/loss rankings and ratings
+
+    Returns
+    ----------
+    A : ndarray
+        (N x N) win distribution coefficients
+    B : ndarray
+        (N x N) loss distribution coefficients
+    """
+
+    N = len(scores)
+    weights = np.array([mmr.weight(competitor.number_of_matches) for competitor in scores])
+    rows, cols, diffs, beat = list(), list(), list(), list()
+    for i in range(N):
+        for w in scores[i].wins:
+            rows.append(i), cols.append(w[0] - 1), diffs.append(w[1]), beat.append(True)
+        for l in scores[i].losses:
+            rows.append(i), cols.append(l[0] - 1), diffs.append(l[1]), beat.append(False)
+    rows, cols, beat = np.array(rows, dtype=int), np.array(cols, dtype=int), np.array(beat, dtype=bool)
+    p = mmr.logistic(np.abs(np.array(diffs, dtype=float)))
+
+    A, B = np.zeros((N, N)), np.zeros((N, N))
+    np.add.at(A, (rows, cols), weights[cols] * np.where(beat, p, 1 - p))
+    np.add.at(B, (rows, cols), weights[cols] * np.where(beat, 1 - p, p))
+    return A, B
+
+
+def performance_rating(scores, min_rating=rating_min, max_rating=rating_max, method='normal', solver='grid', plot=False,
+                       cache=curve_cache):
     """
     Calculates the performance ratings for all competitors
 
@@ -160,8 +222,13 @@ def performance_rating(scores, min_rating=rating_min, max_rating=rating_max, met
     method : str
         normal: Gaussian distribution
         logistic: logistic distribution
+    solver : str
+        grid: argmin of |Q| over every integer rating
+        newton: argmin of |Q| over the integer ratings around the Newton-Raphson roots of Q and Q' and the kinks of Q
     plot : bool
         Plot Q
+    cache : curves.CurveCache
+        grid curves of earlier opponents, keyed on rating and uncertainty, None computes every curve
 
     Returns
     ----------
@@ -173,27 +240,73 @@ def performance_rating(scores, min_rating=rating_min, max_rating=rating_max, met
     x = np.linspace(min_rating, max_rating, M)
     N = len(scores)
 
+    skill = np.array([competitor.rating for competitor in scores], dtype=float)
+    uncertainty = np.array([competitor.uncertainty for competitor in scores], dtype=float)
+
+    A, B = opponent_coefficients(scores)
+
+    if solver == 'newton' and plot is False:
+        def q(val, rows):
+            val = val[:, np.newaxis]
+            win = mmr.win_distribution(val, skill, uncertainty, method=method)
+            loss = mmr.loss_distribution(val, skill, uncertainty, method=method)
+            win_prime = mmr.win_distribution_prime(val, skill, uncertainty, method=method, win=win)
+            loss_prime = mmr.loss_distribution_prime(val, skill, uncertainty, method=method, loss=loss)
+            a, b = A[rows], B[rows]
+            return np.einsum('ij,ij->i', a, win) + np.einsum('ij,ij->i', b, loss), \
+                np.einsum('ij,ij->i', a, win_prime) + np.einsum('ij,ij->i', b, loss_prime)
+
+        def q_prime(val, rows):
+            val = val[:, np.newaxis]
+            win = mmr.win_distribution(val, skill, uncertainty, method=method)
+            loss = mmr.loss_distribution(val, skill, uncertainty, method=method)
+            win_prime = mmr.win_distribution_prime(val, skill, uncertainty, method=method, win=win)
+            loss_prime = mmr.loss_distribution_prime(val, skill, uncertainty, method=method, loss=loss)
+            win_prime2 = mmr.win_distribution_prime2(val, skill, uncertainty, method=method, win=win,
+                                                     win_prime=win_prime)
+            loss_prime2 = mmr.loss_distribution_prime2(val, skill, uncertainty, method=method, loss=loss,
+                                                       loss_prime=loss_prime)
+            a, b = A[rows], B[rows]
+            return np.einsum('ij,ij->i', a, win_prime) + np.einsum('ij,ij->i', b, loss_prime), \
+                np.einsum('ij,ij->i', a, win_prime2) + np.einsum('ij,ij->i', b, loss_prime2)
+
+        def q_scan(val):
+            ## val is not an evenly spaced grid, so the curves do not come from the cache
+            scratch = np.empty((N, len(val)))
+            win = mmr.win_distribution(val, skill[:, np.newaxis], uncertainty[:, np.newaxis], method=method,
+                                       scratch=scratch)
+            loss = mmr.loss_distribution(val, skill[:, np.newaxis], uncertainty[:, np.newaxis], method=method,
+                                         scratch=scratch)
+            win_prime = mmr.win_distribution_prime(val, skill[:, np.newaxis], uncertainty[:, np.newaxis],
+                                                   method=method, win=win)
+            loss_prime = mmr.loss_distribution_prime(val, skill[:, np.newaxis], uncertainty[:, np.newaxis],
+                                                     method=method, loss=loss)
+            return (A @ win + B @ loss).T, (A @ win_prime + B @ loss_prime).T
+
+        ## Q has a kink at the edge of every opponent's linear tails
+        edges = np.concatenate([skill - 2 * uncertainty, skill + 2 * uncertainty])
+        performance = mmr.grid_argmin(q, q_prime, min_rating, max_rating, size=N, scan=q_scan, nodes=edges)
+    else:
+        ## Win and loss curves of every opponent, built once per match (N x M)
+        if cache is None:
+            scratch = np.empty((N, M))
+            win = mmr.win_distribution(x, skill[:, np.newaxis], uncertainty[:, np.newaxis], method=method,
+                                       scratch=scratch)
+            loss = mmr.loss_distribution(x, skill[:, np.newaxis], uncertainty[:, np.newaxis], method=method,
+                                         scratch=scratch)
+        else:
+            win, loss = cache.get(x, skill, uncertainty, method=method)
+        Q = A @ win + B @ loss
+        performance = x[np.argmin(np.abs(Q), axis=1)]
+
     for i in range(N):
-        Q = np.zeros(M)
-        for w in scores[i].wins:
-            Q += mmr.weight(scores[w[0] - 1].number_of_matches) * \
-                 (mmr.logistic(np.abs(w[1])) *
-                  mmr.win_distribution(x, scores[w[0] - 1].rating, scores[w[0] - 1].uncertainty, method=method) +
-                  (1 - mmr.logistic(np.abs(w[1]))) *
-                  mmr.loss_distribution(x, scores[w[0] - 1].rating, scores[w[0] - 1].uncertainty, method=method))
-        for l in scores[i].losses:
-            Q += mmr.weight(scores[l[0] - 1].number_of_matches) * \
-                 (mmr.logistic(np.abs(l[1])) *
-                  mmr.loss_distribution(x, scores[l[0] - 1].rating, scores[l[0] - 1].uncertainty, method=method) +
-                  (1 - mmr.logistic(np.abs(l[1]))) *
-                  mmr.win_distribution(x, scores[l[0] - 1].rating, scores[l[0] - 1].uncertainty, method=method))
-        scores[i].performance = x[np.argmin(np.abs(Q))]
+        scores[i].performance = performance[i]
         if plot is True:
-            plt.plot(x, Q, label=scores[i].first + ' ' + scores[i].last)
+            plt.plot(x, Q[i], label=scores[i].first + ' ' + scores[i].last)
     return scores
 
 
-def new_rating(competitor, match_uncert, stage_count, competitor_count, min_rating=rating_min, max_rating=rating_max, method=mmr_method, plot=False):
+def new_rating(competitor, match_uncert, stage_count, competitor_count, min_rating=rating_min, max_rating=rating_max, method=mmr_method, solver=mmr_solver, plot=False):
     """
     Calculates the performance ratings for all competitors
 
@@ -214,6 +327,10 @@ def new_rating(competitor, match_uncert, stage_count, competitor_count, min_rati
     method : str
         normal: Gaussian distribution
         logistic: logistic distribution
+    solver : str
+        grid: argmax of the rating distribution over every integer rating
+        newton: bracketed Newton-Raphson root of the rating distribution's log-derivative
+        The normal method always uses the closed-form Gaussian posterior
     plot : bool
         Plot new Rating distribution
 
@@ -223,12 +340,30 @@ def new_rating(competitor, match_uncert, stage_count, competitor_count, min_rati
         updated competitor
     """
 
-    M = max_rating - min_rating + 1
-    x = np.linspace(min_rating, max_rating, M)
-    skill = mmr.pdf(x, competitor.rating, competitor.uncertainty, method=method)
-    perf = mmr.pdf(x, competitor.performance, match_uncert, method=method)
-    rating_distribution = skill * perf
-    delta = x[np.argmax(rating_distribution)] - competitor.rating
+    if method == 'normal' and plot is False:
+        mode, _ = mmr.normal_posterior(competitor.rating, competitor.uncertainty, competitor.performance, match_uncert)
+        delta = np.clip(mode, min_rating, max_rating) - competitor.rating
+    elif solver == 'newton' and plot is False:
+        def posterior(val, rows):
+            return mmr.log_pdf_prime(val, competitor.rating, competitor.uncertainty, method=method) + \
+                   mmr.log_pdf_prime(val, competitor.performance, match_uncert, method=method), \
+                   mmr.log_pdf_prime2(val, competitor.rating, competitor.uncertainty, method=method) + \
+                   mmr.log_pdf_prime2(val, competitor.performance, match_uncert, method=method)
+
+        # the log posterior is concave, its slope only fails to change sign when the mode is at a bound
+        roots = mmr.solve(posterior, min_rating, max_rating)[0]
+        if roots.size > 0:
+            mode = roots[0]
+        else:
+            mode = max_rating if posterior(np.array([max_rating]), None)[0][0] > 0 else min_rating
+        delta = mode - competitor.rating
+    else:
+        M = max_rating - min_rating + 1
+        x = np.linspace(min_rating, max_rating, M)
+        skill = mmr.pdf(x, competitor.rating, competitor.uncertainty, method=method)
+        perf = mmr.pdf(x, competitor.performance, match_uncert, method=method)
+        rating_distribution = skill * perf
+        delta = x[np.argmax(rating_distribution)] - competitor.rating
 
     w_stages = (mmr.logistic(stage_count - 1, scale=stage_count_factor) - 0.5) * 3 + 0.1
     w_competitors = (mmr.logistic(competitor_count - 1, scale=competitor_count_factor) - 0.5) * 3 + 0.1
@@ -264,9 +399,9 @@ def match_uncertainty(scores):
     return np.sqrt(u_sqr)
 
 
-def new_uncertainty(scores, match_uncertainty):
+def new_uncertainty(scores, match_uncertainty, method=mmr_method):
     """
-    Calculates the new rating uncertainty for all competitors
+    Calculates the new rating uncertainty for all competitors, never below uncertainty_min
 
     Parameters
     ----------
@@ -274,6 +409,9 @@ def new_uncertainty(scores, match_uncertainty):
         list of Competitors at match
     match_uncertainty : float
         combined uncertainty for the entire match
+    method : str
+        normal: Gaussian posterior standard deviation
+        logistic: pseudo RMS approximation
 
     Returns
     ----------
@@ -284,6 +422,10 @@ def new_uncertainty(scores, match_uncertainty):
         return 0.5 * np.sqrt(u1 ** 2 + u2 ** 2)
 
     for competitor in scores:
-        uncertainty = pseudo_rms(competitor.uncertainty, match_uncertainty)
-        competitor.uncertainty = uncertainty
+        if method == 'normal':
+            _, uncertainty = mmr.normal_posterior(competitor.rating, competitor.uncertainty, competitor.performance,
+                                                  match_uncertainty)
+        else:
+            uncertainty = pseudo_rms(competitor.uncertainty, match_uncertainty)
+        competitor.uncertainty = float(max(uncertainty, uncertainty_min))
     return scores
@@ -0,0 +1,154 @@
+from config import *
+from Utilities import filehandler
+
+# Columns of a rating entry, in insert order
+columns = ('first', 'last', 'uspsa_number', 'match_type', 'division', 'rating', 'last_change', 'uncertainty',
+           'performance', 'match_count', 'percent', 'match_id', 'match_name', 'club', 'club_code', 'match_date',
+           'match_date_unix')
+
+# Rating history layout of the classic Elo release, quoted column: current column
+legacy_columns = {'First Name': 'first', 'Last Name': 'last', 'USPSA Number': 'uspsa_number',
+                  'Match Type': 'match_type', 'Division': 'division', 'Elo': 'rating', 'Match ID': 'match_id',
+                  'Match Date': 'match_date', 'Match Date Unix': 'match_date_unix'}
+
+_migrated = set()
+
+
+def _ratings_columns(cursor):
+    """
+    Column names of the ratings table, empty if it does not exist
+    """
+    cursor.execute('''PRAGMA table_info(ratings)''')
+    return [column[1] for column in cursor.fetchall()]
+
+
+def _is_legacy(cursor):
+    """
+    True if the ratings table still has the classic Elo layout
+    """
+    found = _ratings_columns(cursor)
+    return bool(found) and all(column in found for column in legacy_columns)
+
+
+def _create_ratings(cursor):
+    """
+    Rating history, one entry per competitor per match. A classic Elo table is kept as ratings_legacy and its entries
+    are copied over.
+    """
+    legacy = _is_legacy(cursor)
+    if legacy:
+        cursor.execute('''ALTER TABLE ratings RENAME TO ratings_legacy''')
+    else:
+        found = _ratings_columns(cursor)
+        missing = [column for column in columns if column not in found]
+        if found and missing:
+            raise IndexError('DATABASE: Unknown ratings table layout, missing ' + ', '.join(missing) + '.')
+
+    cursor.execute('''CREATE TABLE IF NOT EXISTS ratings (
+                          first TEXT, last TEXT, uspsa_number TEXT, match_type TEXT, division TEXT, rating REAL,
+                          last_change REAL, uncertainty REAL, performance REAL, match_count INTEGER, percent REAL,
+                          match_id INTEGER, match_name TEXT, club TEXT, club_code TEXT, match_date TEXT,
+                          match_date_unix INTEGER)''')
+
+    if legacy:
+        cursor.execute('''INSERT INTO ratings({0}) SELECT {1} FROM ratings_legacy ORDER BY rowid'''.format(
+            ', '.join(legacy_columns.values()), ', '.join('"' + column + '"' for column in legacy_columns)))
+
+
+def _index_members(cursor):
+    """
+    Normalized member number column and composite lookup indexes
+    """
+    cursor.execute('''PRAGMA table_info(ratings)''')
+    if 'member_key' not in [column[1] for column in cursor.fetchall()]:
+        cursor.execute('''ALTER TABLE ratings ADD COLUMN member_key TEXT''')
+    cursor.execute('''UPDATE ratings SET member_key=UPPER(uspsa_number) WHERE member_key IS NULL''')
+    cursor.execute('''CREATE INDEX IF NOT EXISTS ratings_member
+                      ON ratings(member_key, division, match_type, match_date_unix)''')
+    cursor.execute('''CREATE INDEX IF NOT EXISTS ratings_uspsa_number
+                      ON ratings(uspsa_number, division, match_type, match_date_unix)''')
+
+
+def _create_current_ratings(cursor):
+    """
+    Latest entry of every member per division and match type, maintained by a trigger on ratings
+    """
+    cursor.execute('''CREATE TABLE IF NOT EXISTS current_ratings (
+                          member_key TEXT NOT NULL, first TEXT, last TEXT, uspsa_number TEXT, match_type TEXT NOT NULL,
+                          division TEXT NOT NULL, rating REAL, last_change REAL, uncertainty REAL, performance REAL,
+                          match_count INTEGER, percent REAL, match_id INTEGER, match_name TEXT, club TEXT,
+                          club_code TEXT, match_date TEXT, match_date_unix INTEGER,
+                          PRIMARY KEY (member_key, division, match_type))''')
+    cursor.execute('''CREATE INDEX IF NOT EXISTS current_ratings_division ON current_ratings(division, rating)''')
+
+    fields = ', '.join(columns)
+    cursor.execute('''INSERT OR REPLACE INTO current_ratings(member_key, {0})
+                      SELECT member_key, {0} FROM (
+                          SELECT member_key, {0}, ROW_NUMBER() OVER (PARTITION BY member_key, division, match_type
+                                                                     ORDER BY match_date_unix DESC, rowid DESC) AS latest
+                          FROM ratings WHERE member_key IS NOT NULL)
+                      WHERE latest=1'''.format(fields))
+
+    new_fields = ', '.join('NEW.' + column for column in columns)
+    cursor.execute('''CREATE TRIGGER IF NOT EXISTS ratings_current AFTER INSERT ON ratings
+                      WHEN NEW.member_key IS NOT NULL
+                      BEGIN
+                          INSERT OR REPLACE INTO current_ratings(member_key, {0})
+                          SELECT NEW.member_key, {1}
+                          WHERE NOT EXISTS (SELECT 1 FROM current_ratings
+                                            WHERE member_key=NEW.member_key AND division=NEW.division
+                                            AND match_type=NEW.match_type
+                                            AND match_date_unix > NEW.match_date_unix);
+                      END'''.format(fields, new_fields))
+
+
+# Schema versions, migration i brings the database to user_version i + 1
+migrations = (_create_ratings, _index_members, _create_current_ratings)
+
+
+def migrate(file=ratings_db):
+    """
+    Brings a ratings database up to the current schema version. Each migration and its PRAGMA user_version bump run in
+    one transaction, so an interrupted migration is rolled back and retried on the next call. A classic Elo ratings
+    table restarts from version 0, whatever its user_version.
+
+    Parameters
+    ----------
+    file : str
+        file path to .db file
+
+    Returns
+    -------
+    version : int
+        schema version of the database
+    """
+    with filehandler.database(file) as cursor:
+        cursor.execute('''PRAGMA user_version''')
+        version = cursor.fetchone()[0]
+        if _is_legacy(cursor):
+            version = 0
+        for i in range(version, len(migrations)):
+            cursor.execute('''BEGIN''')
+            try:
+                migrations[i](cursor)
+                cursor.execute('''PRAGMA user_version={}'''.format(i + 1))
+            except BaseException:
+                cursor.connection.rollback()
+                raise
+            cursor.connection.commit()
+
+    _migrated.add(file)
+    return len(migrations)
+
+
+def ensure(file=ratings_db):
+    """
+    Migrates a ratings database once per process
+
+    Parameters
+    ----------
+    file : str
+        file path to .db file
+    """
+    if file not in _migrated:
+        migrate(file)
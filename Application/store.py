@@ -0,0 +1,126 @@
+from config import *
+from Utilities import filehandler
+from Application import database, schema
+
+
+class RatingStore:
+    """
+    In-memory rating state for replays. Serves the same get_ratings_bulk / write_competitors calls as the database
+    module, but keeps the latest rating of every member in a dict and only writes history rows to the database in
+    batches. A collecting store never writes, it keeps the history rows for the caller instead.
+
+    Attributes
+    ----------
+    file : str
+        file path to .db file
+    checkpoint : int
+        number of pending history rows that triggers a flush to the database
+    ratings : dict
+        {(MEMBER, division, match_type): (rating, uncertainty, match_count, match_date_unix)}
+    pending : list
+        Competitors written since the last flush
+    division : str
+        only load this division, None loads all
+    collect : bool
+        keep flushed history rows in rows instead of writing them to the database
+    rows : list
+        history rows flushed by a collecting store, see database.competitor_rows
+    """
+    def __init__(self, file=ratings_db, checkpoint=50000, preload=True, division=None, collect=False):
+        self.file = file
+        self.checkpoint = checkpoint
+        self.division = division
+        self.collect = collect
+        self.ratings = dict()
+        self.pending = list()
+        self.rows = list()
+        if preload is True:
+            self.load()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.flush()
+
+    def load(self):
+        """
+        Reads the latest rating of every member from the database
+        """
+        schema.ensure(self.file)
+        with filehandler.database(self.file) as cursor:
+            sql = '''SELECT member_key, division, match_type, rating, uncertainty, match_count, match_date_unix
+                     FROM current_ratings'''
+            if self.division is None:
+                cursor.execute(sql)
+            else:
+                cursor.execute(sql + ''' WHERE division=?''', (self.division,))
+
+            try:
+                data = cursor.fetchall()
+            except:
+                raise IndexError('DATABASE: Read error.')
+
+        for row in data:
+            self.ratings[row[0:3]] = row[3:]
+
+    def get_ratings_bulk(self, members, division, match_type):
+        """
+        Most recent rating info for many members
+
+        Parameters
+        ----------
+        members : list
+            USPSA member numbers
+        division : str
+            Name of the division
+        match_type : str
+            Type of match
+
+        Returns
+        -------
+        ratings : dict
+            {MEMBER: (rating, uncertainty, match_count)} keyed by upper case member number, members without an entry
+            are left out
+        """
+        ratings = dict()
+        for member in members:
+            if member is None:
+                continue
+            data = self.ratings.get((member.upper(), division, match_type))
+            if data is not None:
+                ratings[member.upper()] = data[0:3]
+        return ratings
+
+    def write_competitors(self, competitors):
+        """
+        Updates the in-memory ratings with a match's results and queues them for the database
+
+        Parameters
+        -------
+        competitors : list
+            list of rating.Competitor
+        """
+        for competitor in competitors:
+            if competitor.member is None:
+                continue
+            key = (competitor.member.upper(), competitor.division, competitor.match_type)
+            latest = self.ratings.get(key)
+            if latest is None or latest[3] is None or competitor.match_date_unix >= latest[3]:
+                self.ratings[key] = (competitor.rating, competitor.uncertainty, competitor.number_of_matches,
+                                     competitor.match_date_unix)
+        self.pending.extend(competitors)
+
+        if len(self.pending) >= self.checkpoint:
+            self.flush()
+
+    def flush(self):
+        """
+        Writes the pending history rows to the database in one transaction, or adds them to rows when collecting
+        """
+        if self.pending:
+            if self.collect:
+                self.rows.extend(database.competitor_rows(self.pending))
+            else:
+                database.write_competitors(self.pending, file=self.file)
+            self.pending = list()
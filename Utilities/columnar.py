@@ -0,0 +1,252 @@
+from config import *
+from Utilities import filehandler
+import uuid
+
+# pyarrow is only needed for the parquet match store
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:
+    pa, pc, ds, pq = None, None, None, None
+
+
+def _require():
+    if pa is None:
+        raise ImportError('COLUMNAR: pyarrow is required for the parquet match store.')
+
+
+def _schemas():
+    """
+    Column types of the overall, stages and scores tables, partition columns last
+    """
+    match = [('match_id', pa.int64()), ('unix', pa.int64())]
+    overall = pa.schema(match + [
+        ('match_name', pa.string()), ('date', pa.string()), ('club', pa.string()), ('club_code', pa.string()),
+        ('level', pa.int64()), ('competitor', pa.int64()), ('uspsa_num', pa.string()), ('firstname', pa.string()),
+        ('lastname', pa.string()), ('disqualify', pa.bool_()), ('class', pa.string()),
+        ('match_points', pa.float64()), ('place', pa.int64()), ('percent', pa.float64()),
+        ('power_factor', pa.string()), ('female', pa.bool_()), ('age', pa.string()), ('law', pa.bool_()),
+        ('military', pa.bool_()), ('division', pa.string()), ('year', pa.int32())])
+    stages = pa.schema(match + [
+        ('number', pa.int64()), ('name', pa.string()), ('min_rounds', pa.int64()), ('max_points', pa.int64()),
+        ('classifier', pa.bool_()), ('classifier_number', pa.string()), ('scoring', pa.string()),
+        ('year', pa.int32())])
+    scores = pa.schema(match + [
+        ('stage', pa.int64()), ('competitor', pa.int64()), ('disqualify', pa.bool_()), ('dnf', pa.bool_()),
+        ('A', pa.int64()), ('B', pa.int64()), ('C', pa.int64()), ('D', pa.int64()), ('M', pa.int64()),
+        ('NS', pa.int64()), ('procedurals', pa.int64()), ('penalties', pa.int64()), ('time', pa.float64()),
+        ('total_points', pa.int64()), ('hitfactor', pa.float64()), ('stage_points', pa.float64()),
+        ('stage_place', pa.int64()), ('division', pa.string()), ('year', pa.int32())])
+    return {'overall': overall, 'stages': stages, 'scores': scores}
+
+
+def _partitioning(table):
+    """
+    Hive partitioning of a table, overall and scores by division and year, stages by year
+    """
+    if table == 'stages':
+        fields = [('year', pa.int32())]
+    else:
+        fields = [('division', pa.string()), ('year', pa.int32())]
+    return ds.partitioning(pa.schema(fields), flavor='hive')
+
+
+def _rows(data):
+    """
+    Rows of one match for the overall, stages and scores tables
+    """
+    match = {'match_id': data['practiscore_id'], 'unix': data['unix'], 'year': int(data['date'].split('/')[-1])}
+    header = {key: data[key] for key in ('match_name', 'date', 'club', 'club_code', 'level')}
+    division = {score['competitor']: score['division'] for score in data['overall']}
+    return {
+        'overall': [dict(score, **header, **match) for score in data['overall']],
+        'stages': [dict(stage, **match) for stage in data['stages']],
+        'scores': [dict(score, division=division.get(score['competitor']), **match) for score in data['scores']]
+    }
+
+
+def write_matches(matches, directory=parquet_dir):
+    """
+    Writes a batch of matches to the parquet store, replacing any earlier copies of them. The batch is written as one
+    file per partition, a match given twice keeps its last copy.
+
+    Parameters
+    ----------
+    matches : list
+        matches in the json format of practiscore.txt_to_json
+    directory : str
+        root folder of the parquet store
+    """
+    _require()
+    matches = {data['practiscore_id']: data for data in matches}
+    if not matches:
+        return
+
+    rows = {'overall': list(), 'stages': list(), 'scores': list()}
+    for data in matches.values():
+        for table, entries in _rows(data).items():
+            rows[table].extend(entries)
+
+    delete_matches(matches.keys(), directory)
+    batch = uuid.uuid4().hex
+    for table, schema in _schemas().items():
+        if not rows[table]:
+            continue
+        ds.write_dataset(pa.Table.from_pylist(rows[table], schema=schema), os.path.join(directory, table),
+                         format='parquet', partitioning=_partitioning(table),
+                         basename_template='part-' + batch + '-{i}.parquet',
+                         existing_data_behavior='overwrite_or_ignore')
+
+
+def write_match(data, directory=parquet_dir):
+    """
+    Writes one match to the parquet store, replacing any earlier copy of it
+
+    Parameters
+    ----------
+    data : dict
+        match in the json format of practiscore.txt_to_json
+    directory : str
+        root folder of the parquet store
+    """
+    write_matches([data], directory)
+
+
+def delete_matches(match_ids, directory=parquet_dir):
+    """
+    Removes matches from the parquet store in one pass. Files holding other matches as well are rewritten without the
+    removed rows, files left empty are deleted.
+
+    Parameters
+    ----------
+    match_ids : iterable
+        practiscore ids of the matches
+    directory : str
+        root folder of the parquet store
+    """
+    _require()
+    ids = pa.array(sorted(match_ids), type=pa.int64())
+    for table in _schemas():
+        path = os.path.join(directory, table)
+        if not os.path.isdir(path):
+            continue
+
+        # fragments are pruned on the match_id statistics of each file
+        dataset = ds.dataset(path, format='parquet', partitioning=_partitioning(table))
+        for fragment in dataset.get_fragments(filter=ds.field('match_id').isin(ids)):
+            data = fragment.to_table(schema=fragment.physical_schema)
+            keep = data.filter(pc.invert(pc.is_in(data['match_id'], value_set=ids)))
+            if keep.num_rows == data.num_rows:
+                continue
+            if keep.num_rows == 0:
+                os.remove(fragment.path)
+            else:
+                pq.write_table(keep, fragment.path)
+
+
+def delete_match(match_id, directory=parquet_dir):
+    """
+    Removes a match from the parquet store
+    """
+    delete_matches([match_id], directory)
+
+
+def import_json(path=root + '/Data/jsonFiles/', directory=parquet_dir, batch_size=parquet_batch_size):
+    """
+    Builds the parquet store from converted .json matches, written in batches
+
+    Parameters
+    ----------
+    path : str
+        directory of .json files
+    directory : str
+        root folder of the parquet store
+    batch_size : int
+        matches per write
+    """
+    files = [file for file in sorted(os.listdir(path)) if file.split('.')[-1] == 'json']
+    for i in range(0, len(files), batch_size):
+        write_matches([filehandler.read_json(os.path.join(path, file)) for file in files[i:i + batch_size]],
+                      directory)
+
+
+def _load(table, directory, division=None, start=None, end=None, match_ids=None, columns=None, level=None):
+    _require()
+    path = os.path.join(directory, table)
+    if not os.path.isdir(path):
+        return pd.DataFrame(columns=columns if columns is not None else _schemas()[table].names)
+
+    # the year bounds let the scan skip whole partitions, the unix bounds are exact
+    predicate = ds.scalar(True)
+    if division is not None and table != 'stages':
+        predicate = predicate & (ds.field('division') == division)
+    if start is not None:
+        year = datetime.datetime.utcfromtimestamp(start - 86400).year
+        predicate = predicate & (ds.field('year') >= year) & (ds.field('unix') >= start)
+    if end is not None:
+        year = datetime.datetime.utcfromtimestamp(end + 86400).year
+        predicate = predicate & (ds.field('year') <= year) & (ds.field('unix') <= end)
+    if match_ids is not None:
+        predicate = predicate & ds.field('match_id').isin(list(match_ids))
+    if level is not None:
+        predicate = predicate & (ds.field('level') >= level)
+
+    dataset = ds.dataset(path, format='parquet', partitioning=_partitioning(table))
+    return dataset.to_table(columns=columns, filter=predicate).to_pandas()
+
+
+def load_overall(division=None, start=None, end=None, match_ids=None, columns=None, level=None,
+                 directory=parquet_dir):
+    """
+    Overall results of many matches from the parquet store. Only the partitions and row groups that can match the
+    filters are read.
+
+    Parameters
+    ----------
+    division : str
+        division name, exact match
+    start : int
+        earliest match date, unix
+    end : int
+        latest match date, unix
+    match_ids : list
+        Practiscore match IDs
+    columns : list
+        columns to read, None reads all
+    level : int
+        minimum match level
+    directory : str
+        root folder of the parquet store
+
+    Returns
+    -------
+    overall : pd.DataFrame
+        one row per competitor per match
+    """
+    return _load('overall', directory, division, start, end, match_ids, columns, level)
+
+
+def load_stages(start=None, end=None, match_ids=None, columns=None, directory=parquet_dir):
+    """
+    Stage info of many matches from the parquet store, see load_overall
+
+    Returns
+    -------
+    stages : pd.DataFrame
+        one row per stage per match
+    """
+    return _load('stages', directory, None, start, end, match_ids, columns)
+
+
+def load_scores(division=None, start=None, end=None, match_ids=None, columns=None, directory=parquet_dir):
+    """
+    Stage scores of many matches from the parquet store, see load_overall
+
+    Returns
+    -------
+    scores : pd.DataFrame
+        one row per competitor per stage per match
+    """
+    return _load('scores', directory, division, start, end, match_ids, columns)
@@ -0,0 +1,277 @@
+from config import *
+from Utilities import filehandler, practiscore as ps
+import concurrent.futures
+import random
+import threading
+
+# Responses worth retrying, anything else is final
+retry_status = (429, 500, 502, 503, 504)
+headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 6.1; WOW64; rv:50.0) Gecko/20100101 Firefox/50.0'}
+
+
+class RateLimiter:
+    """
+    Spaces requests evenly so all threads together stay under a requests-per-second cap
+    """
+    def __init__(self, rate=download_rate):
+        self.interval = 1 / rate if rate else 0
+        self.next = time.monotonic()
+        self.lock = threading.Lock()
+
+    def wait(self):
+        with self.lock:
+            now = time.monotonic()
+            start = max(now, self.next)
+            self.next = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+
+class Progress:
+    """
+    Thread-safe count of finished match IDs by status, and the IDs currently being downloaded
+    """
+    def __init__(self, total, report_every=100):
+        self.total = total
+        self.report_every = report_every
+        self.in_flight = set()
+        self.status = dict()
+        self.completed = 0
+        self.lock = threading.Lock()
+
+    def start(self, match_id):
+        with self.lock:
+            self.in_flight.add(match_id)
+
+    def finish(self, match_id, status):
+        with self.lock:
+            self.in_flight.discard(match_id)
+            self.status.setdefault(status, list()).append(match_id)
+            self.completed += 1
+            if self.completed % self.report_every == 0 or self.completed == self.total:
+                self.report()
+
+    def report(self):
+        counts = ', '.join(key + ': ' + str(len(value)) for key, value in sorted(self.status.items()))
+        print('Completed', str(self.completed) + '/' + str(self.total), '(' + counts + ')',
+              'In flight:', sorted(self.in_flight))
+
+
+class NegativeCache:
+    """
+    Persistent record of match IDs that did not give a download (missing, not USPSA or below the requested level), so
+    later runs skip them without a network request.
+
+    Attributes
+    ----------
+    file : str
+        file path to .json file
+    ttl : float
+        seconds before an entry is checked again, None keeps entries forever
+    entries : dict
+        {match ID: {'reason': str, 'timestamp': unix, 'level': int}}
+    """
+    def __init__(self, file=negative_cache, ttl=negative_cache_ttl):
+        self.file = file
+        self.ttl = ttl
+        self.entries = dict()
+        self.lock = threading.Lock()
+        if file is not None and os.path.isfile(file):
+            self.entries = filehandler.read_json(file)
+
+    def reason(self, match_id, level=None):
+        """
+        Reason match_id was cached, None if it has to be requested
+
+        Parameters
+        ----------
+        match_id : int
+            Practiscore match ID
+        level : int
+            requested match level, a match dropped for its level is only skipped for the same or a higher level
+        """
+        entry = self.entries.get(str(match_id))
+        if entry is None:
+            return None
+        if self.ttl is not None and time.time() - entry['timestamp'] > self.ttl:
+            return None
+        if entry['reason'] == 'level' and (level is None or level < entry['level']):
+            return None
+        return entry['reason']
+
+    def add(self, match_id, reason, level=None):
+        with self.lock:
+            self.entries[str(match_id)] = {'reason': reason, 'timestamp': int(time.time()), 'level': level}
+
+    def save(self):
+        if self.file is not None:
+            with self.lock:
+                filehandler.write_json(self.file, self.entries, compact=True)
+
+
+def new_session(pool_size=download_workers):
+    """
+    requests.Session with a connection pool large enough for every worker thread
+    """
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers.update(headers)
+    return session
+
+
+def fetch(session, url, limiter=None, retries=download_retries, backoff=1, timeout=download_timeout):
+    """
+    GET with a timeout, retrying connection errors and retry_status responses with exponential backoff
+
+    Parameters
+    ----------
+    session : requests.Session
+        pooled session
+    url : str
+        url
+    limiter : RateLimiter
+        shared rate limiter, None for no limit
+    retries : int
+        number of retries after the first attempt
+    backoff : float
+        delay before the first retry in seconds, doubled on every retry
+    timeout : float
+        connect and read timeout in seconds
+
+    Returns
+    -------
+    page : requests.Response
+        last response
+    """
+    for attempt in range(retries + 1):
+        if limiter is not None:
+            limiter.wait()
+        try:
+            page = session.get(url, timeout=timeout)
+        except (requests.ConnectionError, requests.Timeout):
+            if attempt == retries:
+                raise
+        else:
+            if page.status_code not in retry_status or attempt == retries:
+                return page
+        time.sleep(backoff * 2 ** attempt * (1 + random.random() / 2))
+
+
+def download_match(match_id, session, limiter=None, base_url=practiscore_url, directory=None, level=None,
+                   cache=None):
+    """
+    Downloads Match Results .txt file for given match id. Labeled match_id.txt
+
+    Parameters
+    ----------
+    match_id : int
+        Practiscore match ID
+    session : requests.Session
+        pooled session
+    limiter : RateLimiter
+        shared rate limiter
+    base_url : str
+        Practiscore address
+    directory : str
+        folder for .txt files
+    level : int
+        only keep matches of this level, 2=2+; 3=3only, None keeps all
+    cache : NegativeCache
+        IDs to skip, missing, not uspsa and level results are added to it
+
+    Returns
+    -------
+    status : str
+        exists, cached, downloaded, missing, not uspsa or level
+    """
+    if directory is None:
+        directory = root + '/Data/txtFiles/'
+    file = directory + str(match_id) + '.txt'
+    if os.path.isfile(file) is True:
+        return 'exists'
+    if cache is not None and cache.reason(match_id, level) is not None:
+        return 'cached'
+
+    status = _download(match_id, file, session, limiter, base_url, directory, level)
+    if cache is not None and status in ('missing', 'not uspsa', 'level'):
+        cache.add(match_id, status, level)
+    return status
+
+
+def _download(match_id, file, session, limiter, base_url, directory, level):
+    page = fetch(session, base_url + '/results/new/' + str(match_id), limiter)
+    if page.status_code == 404:
+        return 'missing'
+    page.raise_for_status()
+
+    try:
+        url = ps.webreport(page, base_url=base_url)
+    except IndexError:
+        return 'not uspsa'
+    page = fetch(session, url, limiter)
+    page.raise_for_status()
+
+    # write under a temporary name so an interrupted download is never taken for a finished one
+    tempfile = os.path.join(directory, str(uuid.uuid4()))
+    with open(tempfile, 'wb') as f:
+        f.write(page.content)
+    if level is not None and ps.islevel2(tempfile, level=level) is False:
+        os.remove(tempfile)
+        return 'level'
+    os.replace(tempfile, file)
+    return 'downloaded'
+
+
+def download_all(match_ids, workers=download_workers, rate=download_rate, base_url=practiscore_url, directory=None,
+                 level=None, cache=negative_cache, report_every=100):
+    """
+    Downloads many matches concurrently over one pooled session
+
+    Parameters
+    ----------
+    match_ids : iterable
+        Practiscore match IDs
+    workers : int
+        maximum number of concurrent downloads
+    rate : float
+        maximum requests per second over all workers, None for no limit
+    base_url : str
+        Practiscore address
+    directory : str
+        folder for .txt files
+    level : int
+        only keep matches of this level, 2=2+; 3=3only, None keeps all
+    cache : str or NegativeCache
+        negative cache or its file path, None requests every ID
+    report_every : int
+        print progress every report_every finished IDs
+
+    Returns
+    -------
+    status : dict
+        {status: [match IDs]}, network errors are reported as failed
+    """
+    match_ids = list(match_ids)
+    limiter = RateLimiter(rate)
+    progress = Progress(len(match_ids), report_every)
+    session = new_session(workers)
+    if cache is not None and not isinstance(cache, NegativeCache):
+        cache = NegativeCache(cache)
+
+    def task(match_id):
+        progress.start(match_id)
+        try:
+            status = download_match(match_id, session, limiter, base_url, directory, level, cache)
+        except (requests.RequestException, OSError):
+            status = 'failed'
+        progress.finish(match_id, status)
+
+    try:
+        with session, concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+            list(executor.map(task, match_ids))
+    finally:
+        if cache is not None:
+            cache.save()
+    return progress.status
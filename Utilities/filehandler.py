@@ -1,5 +1,18 @@
 from config import *
 from Utilities import practiscore as ps
+import concurrent.futures
+import contextlib
+import threading
+
+# Applied to every pooled connection. WAL lets readers and the writer work concurrently, synchronous=NORMAL is
+# durable at transaction boundaries in WAL mode, and a large page cache keeps the hot indexes in memory.
+database_pragmas = ('PRAGMA journal_mode=WAL',
+                    'PRAGMA synchronous=NORMAL',
+                    'PRAGMA cache_size=-65536',
+                    'PRAGMA temp_store=MEMORY',
+                    'PRAGMA mmap_size=268435456')
+
+_connections = threading.local()
 
 
 class Date:
@@ -71,17 +84,94 @@ def add_to_json(file, data):
     os.replace(tempfile, file)
 
 
+def write_json(file, data, compact=False):
+    """
+    Writes a complete json document in one atomic replace
+
+    Parameters
+    ----------
+    file : str
+        file path to .json file
+    data : dict
+        json document
+    compact : bool
+        write without indentation or whitespace
+    """
+    tempfile = os.path.join(os.path.dirname(file), str(uuid.uuid4()))
+    with open(tempfile, 'w', encoding='utf-8') as f:
+        if compact is True:
+            json.dump(data, f, separators=(',', ':'))
+        else:
+            json.dump(data, f, indent=4)
+    os.replace(tempfile, file)
+
+
 def read_json(file):
     with open(file, 'r') as f:
         jdata = json.load(f)
     return jdata
 
 
-def convert_to_json(path=root+'/Data/txtFiles/'):
-    file_list = os.listdir(path)
-    for file in file_list:
-        if file.split('.')[-1] == 'txt':
-            ps.txt_to_json(path + file)
+def _convert(file, compact=False):
+    """
+    Converts one practiscore.txt file, returns the error message instead of raising so a bad file does not stop a
+    batch
+    """
+    try:
+        ps.txt_to_json(file, compact=compact)
+    except Exception as error:
+        return repr(error)
+
+
+def convert_to_json(path=root+'/Data/txtFiles/', workers=conversion_workers, force=False, compact=False):
+    """
+    Converts every practiscore.txt file in a directory to json. Files whose json is newer than the .txt are skipped.
+
+    Parameters
+    ----------
+    path : str
+        directory of .txt files
+    workers : int
+        number of worker processes, 1 converts in this process
+    force : bool
+        reconvert files that are up to date
+    compact : bool
+        write the json without indentation
+
+    Returns
+    -------
+    summary : dict
+        {'converted': [files], 'skipped': [files], 'failed': [(file, error)]}
+    """
+    summary = {'converted': list(), 'skipped': list(), 'failed': list()}
+    files = list()
+    for file in os.listdir(path):
+        if file.split('.')[-1] != 'txt':
+            continue
+        file = path + file
+        jfile = ps.json_file(file)
+        if force is False and os.path.isfile(jfile) and os.path.getmtime(jfile) >= os.path.getmtime(file):
+            summary['skipped'].append(file)
+        else:
+            files.append(file)
+
+    if workers is None or workers <= 1 or len(files) <= 1:
+        errors = [_convert(file, compact) for file in files]
+    else:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+            errors = list(executor.map(_convert, files, [compact] * len(files), chunksize=8))
+
+    for file, error in zip(files, errors):
+        if error is None:
+            summary['converted'].append(file)
+        else:
+            summary['failed'].append((file, error))
+
+    print('Converted:', len(summary['converted']), 'Skipped:', len(summary['skipped']),
+          'Failed:', len(summary['failed']))
+    for file, error in summary['failed']:
+        print(file, error)
+    return summary
 
 
 def open_database(file=None):
@@ -101,3 +191,74 @@ def close_database(cursor, conn):
     cursor.close()
     conn.close()
 
+
+def connect(file=None):
+    """
+    Persistent connection to a database, one per thread and file
+
+    Parameters
+    ----------
+    file : str
+        file path to .db file
+
+    Returns
+    -------
+    conn : sqlite3.Connection
+        open connection
+    """
+    if file is None:
+        raise FileNotFoundError('DATABASE: Missing database file input.')
+
+    # connections are not shared with forked processes
+    if getattr(_connections, 'pid', None) != os.getpid():
+        _connections.pid = os.getpid()
+        _connections.pool = dict()
+
+    conn = _connections.pool.get(file)
+    if conn is None:
+        try:
+            conn = sqlite3.connect(file, timeout=30)
+        except (sqlite3.InterfaceError, sqlite3.OperationalError):
+            raise FileNotFoundError('DATABASE: Unable to open ' + str(file))
+        for pragma in database_pragmas:
+            conn.execute(pragma)
+        _connections.pool[file] = conn
+    return conn
+
+
+@contextlib.contextmanager
+def database(file=None):
+    """
+    Cursor on the thread's persistent connection. Commits on exit, rolls back if an exception is raised.
+
+    Parameters
+    ----------
+    file : str
+        file path to .db file
+
+    Yields
+    -------
+    cursor : sqlite3.Cursor
+        database cursor
+    """
+    conn = connect(file)
+    cursor = conn.cursor()
+    try:
+        yield cursor
+    except BaseException:
+        conn.rollback()
+        raise
+    else:
+        conn.commit()
+    finally:
+        cursor.close()
+
+
+def close_connections():
+    """
+    Closes the calling thread's persistent connections
+    """
+    if getattr(_connections, 'pid', None) == os.getpid():
+        for conn in _connections.pool.values():
+            conn.close()
+        _connections.pool.clear()
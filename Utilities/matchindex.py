@@ -0,0 +1,170 @@
+from config import *
+from Utilities import filehandler
+
+# Header fields of the index, in majors_list order
+columns = ('match_name', 'date', 'unix', 'practiscore_id', 'club', 'club_code', 'level')
+
+_created = set()
+
+
+def ensure(file=matches_db):
+    """
+    Creates the match index tables once per process
+
+    Parameters
+    ----------
+    file : str
+        file path to .db file
+    """
+    if file in _created:
+        return
+    with filehandler.database(file) as cursor:
+        cursor.execute('''CREATE TABLE IF NOT EXISTS matches (
+                              practiscore_id INTEGER PRIMARY KEY, match_name TEXT, date TEXT, unix INTEGER,
+                              level INTEGER, club TEXT, club_code TEXT, classifiers INTEGER, file TEXT,
+                              mtime REAL)''')
+        cursor.execute('''CREATE INDEX IF NOT EXISTS matches_date ON matches(unix, practiscore_id)''')
+        cursor.execute('''CREATE TABLE IF NOT EXISTS match_divisions (
+                              practiscore_id INTEGER NOT NULL, division TEXT NOT NULL, competitors INTEGER,
+                              PRIMARY KEY (practiscore_id, division))''')
+        cursor.execute('''CREATE INDEX IF NOT EXISTS match_divisions_division ON match_divisions(division)''')
+    _created.add(file)
+
+
+def index_match(data, json_file, file=matches_db):
+    """
+    Adds or replaces a match in the index
+
+    Parameters
+    ----------
+    data : dict
+        match in the json format of practiscore.txt_to_json
+    json_file : str
+        file path to the match .json file
+    file : str
+        file path to .db file
+    """
+    ensure(file)
+    divisions = dict()
+    for score in data['overall']:
+        divisions[score['division']] = divisions.get(score['division'], 0) + 1
+
+    match_id = data['practiscore_id']
+    with filehandler.database(file) as cursor:
+        cursor.execute('''INSERT OR REPLACE INTO matches VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''',
+                       (match_id, data['match_name'], data['date'], data['unix'], data['level'], data['club'],
+                        data['club_code'], data['classifiers'], json_file, os.path.getmtime(json_file)))
+        cursor.execute('''DELETE FROM match_divisions WHERE practiscore_id=?''', (match_id,))
+        cursor.executemany('''INSERT INTO match_divisions VALUES (?, ?, ?)''',
+                           [(match_id, division, count) for division, count in divisions.items()])
+
+
+def update(directory=root + '/Data/jsonFiles/', file=matches_db):
+    """
+    Brings the index in line with a folder of .json matches. Only files that are new or changed since they were
+    indexed are read, matches whose file is gone are removed.
+
+    Parameters
+    ----------
+    directory : str
+        folder of .json files
+    file : str
+        file path to .db file
+
+    Returns
+    -------
+    count : int
+        number of matches read
+    """
+    ensure(file)
+    with filehandler.database(file) as cursor:
+        cursor.execute('''SELECT file, mtime FROM matches''')
+        try:
+            indexed = dict(cursor.fetchall())
+        except:
+            raise IndexError('DATABASE: Read error.')
+
+    present, count = set(), 0
+    for name in os.listdir(directory):
+        if name.split('.')[-1] != 'json':
+            continue
+        json_file = directory + name
+        present.add(json_file)
+        if indexed.get(json_file) != os.path.getmtime(json_file):
+            index_match(filehandler.read_json(json_file), json_file, file)
+            count += 1
+
+    gone = [(json_file,) for json_file in indexed if json_file.startswith(directory) and json_file not in present]
+    if gone:
+        with filehandler.database(file) as cursor:
+            cursor.executemany('''DELETE FROM match_divisions WHERE practiscore_id IN
+                                  (SELECT practiscore_id FROM matches WHERE file=?)''', gone)
+            cursor.executemany('''DELETE FROM matches WHERE file=?''', gone)
+    return count
+
+
+def matches(level=None, division=None, start=None, end=None, file=matches_db):
+    """
+    Indexed matches in date order
+
+    Parameters
+    ----------
+    level : int
+        minimum match level
+    division : str
+        only matches with competitors in this division
+    start : int
+        earliest match date, unix
+    end : int
+        latest match date, unix
+    file : str
+        file path to .db file
+
+    Returns
+    -------
+    matches : list
+        [{match_name, date, unix, practiscore_id, club, club_code, level, file}] oldest first
+    """
+    ensure(file)
+    sql = '''SELECT {}, file FROM matches WHERE 1'''.format(', '.join(columns))
+    args = list()
+    if level is not None:
+        sql += ''' AND level>=?'''
+        args.append(level)
+    if start is not None:
+        sql += ''' AND unix>=?'''
+        args.append(start)
+    if end is not None:
+        sql += ''' AND unix<=?'''
+        args.append(end)
+    if division is not None:
+        sql += ''' AND practiscore_id IN (SELECT practiscore_id FROM match_divisions WHERE division=? COLLATE NOCASE)'''
+        args.append(division)
+    sql += ''' ORDER BY unix, practiscore_id'''
+
+    with filehandler.database(file) as cursor:
+        cursor.execute(sql, args)
+        try:
+            data = cursor.fetchall()
+        except:
+            raise IndexError('DATABASE: Read error.')
+    return [dict(zip(columns + ('file',), row)) for row in data]
+
+
+def division_counts(match_id, file=matches_db):
+    """
+    Number of competitors per division of an indexed match
+
+    Returns
+    -------
+    divisions : dict
+        {division: competitors}
+    """
+    ensure(file)
+    with filehandler.database(file) as cursor:
+        cursor.execute('''SELECT division, competitors FROM match_divisions WHERE practiscore_id=?''', (match_id,))
+        try:
+            data = cursor.fetchall()
+        except:
+            raise IndexError('DATABASE: Read error.')
+    return dict(data)
@@ -1,8 +1,15 @@
 from config import *
-from Utilities import filehandler
+from Utilities import filehandler, downloader, columnar, matchindex
 from Application import rating
 from lxml import etree
 from io import StringIO
+import copy
+import functools
+import html
+import re
+
+# href of an <a> tag in raw html, quoted or bare, not a data-href or other attribute ending in href
+_anchor_href = re.compile(rb'''<a\s[^>]*?(?<=\s)href\s*=\s*["']?([^"'\s>]*)''', re.IGNORECASE)
 
 
 class Match:
@@ -35,52 +42,53 @@ def competitor_list(match_file=root + '/Data/major_matches.json', level=3):
 
     :param match_file: file path to .json match list
     :type match_file: str
-    :param level: match level
+    :param level: match level, matches come from match_file for levels 2 and 3 and from the match index otherwise
     :type level: int
     :return: Data frame of all competitors
     :rtype: pd.DataFrame
     """
-
-    if level == 3:
-        matches = filehandler.read_json(match_file)['level3'][0]
+    key = 'level' + str(level)
+    match_list = filehandler.read_json(match_file) if os.path.isfile(match_file) else dict()
+    if key in match_list:
+        matches = match_list[key][0]
     else:
-        print('Not level 3')
-        return
+        matches = [match for match in matchindex.matches(level=level) if match['level'] == level]
 
-    df = pd.DataFrame(columns=['firstname', 'lastname', 'uspsa', 'number', 'match', 'division', 'class', 'percent'])
+    columns = {'firstname': list(), 'lastname': list(), 'uspsa': list(), 'match': list(), 'division': list(),
+               'class': list(), 'percent': list()}
     for match in matches:
         file = root + '/Data/jsonFiles/' + str(match['practiscore_id']) + '.json'
         scores = filehandler.read_json(file)['overall']
-        for score in scores:
-            number = ''.join(c for c in score['uspsa_num'] if c.isdigit())
-            try:
-                number = int(number)
-            except:
-                number = 0
-            df.loc[len(df.index)] = [score['firstname'], score['lastname'], score['uspsa_num'], number,
-                                     match['match_name'], score['division'], score['class'], score['percent']]
+        columns['firstname'].extend(score['firstname'] for score in scores)
+        columns['lastname'].extend(score['lastname'] for score in scores)
+        columns['uspsa'].extend(score['uspsa_num'] for score in scores)
+        columns['match'].extend([match['match_name']] * len(scores))
+        columns['division'].extend(score['division'] for score in scores)
+        columns['class'].extend(score['class'] for score in scores)
+        columns['percent'].extend(score['percent'] for score in scores)
+
+    df = pd.DataFrame(columns)
+    number = df['uspsa'].astype(str).str.replace(r'\D', '', regex=True)
+    df.insert(3, 'number', pd.to_numeric(number, errors='coerce').fillna(0).astype(int))
     return df
 
 
 def majors_list(directory=root+'/Data/jsonFiles/'):
-    file_list = os.listdir(directory)
+    """
+    Writes the Level II and Level III matches, oldest first, to major_matches.json. Uses the match index, only
+    matches converted since the last call are read.
+
+    :param directory: folder of .json files
+    :type directory: str
+    """
+    matchindex.update(directory)
     majors_file = root + '/Data/major_matches.json'
     level2, level3 = list(), list()
-    for file in file_list:
-        path = root + '/Data/jsonFiles/' + file
-        data = filehandler.read_json(path)
-        info = {
-            "match_name": data['match_name'],
-            "date": data['date'],
-            "unix": data['unix'],
-            "practiscore_id": data['practiscore_id'],
-            "club": data['club'],
-            "club_code": data['club_code'],
-            "level": data['level']
-        }
-        if data['level'] == 2:
+    for match in matchindex.matches(level=2):
+        info = {key: match[key] for key in matchindex.columns}
+        if match['level'] == 2:
             level2.append(info)
-        if data['level'] == 3:
+        if match['level'] == 3:
             level3.append(info)
 
     data = {
@@ -107,10 +115,11 @@ def download_all(start_id=156251, end_id=181678, level=2):
     Downloads match results from practiscore for given match id range
     :param start_id:
     :param end_id:
-    :param level: match level (2=2+; 3=3only)
+    :param level: match level (2=2+; 3=3only; None=all)
+    :return: {status: [match ids]}
+    :rtype: dict
     """
-    for match in range(start_id, end_id + 1):
-        download_match(match, level=level)
+    return downloader.download_all(range(start_id, end_id + 1), level=level)
 
 
 def download_match(match_id):
@@ -119,31 +128,46 @@ def download_match(match_id):
     :param match_id: Practiscore match ID
     :type match_id: int
     """
-    file = root + '/Data/txtFiles/' + str(match_id) + '.txt'
+    cache = downloader.NegativeCache()
+    with downloader.new_session(1) as session:
+        status = downloader.download_match(match_id, session, cache=cache)
+    cache.save()
 
-    if os.path.isfile(file) is True:
+    if status == 'exists':
         print(match_id, 'is already downloaded.')
-        return
-
-    headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 6.1; WOW64; rv:50.0) Gecko/20100101 Firefox/50.0'}
-    url = 'https://practiscore.com/results/new/' + str(match_id)
-    page = requests.get(url, headers=headers)
-
-    try:
-        url = webreport(page)
-    except:
+    if status == 'cached':
+        print(match_id, 'was skipped before:', cache.reason(match_id))
+    if status == 'not uspsa':
         print(match_id, 'is not a USPSA match.')
-        return
-    page = requests.get(url, headers=headers)
-    with open(file, 'wb') as f:
-        for chunk in page.iter_content(chunk_size=8192):
-            f.write(chunk)
 
 
-def webreport(page):
+def webreport(page, base_url=practiscore_url):
+    """
+    Returns the URL for the Web Report. Searches the raw page for the web report address and stops at the first one
+    that is an <a href>, without decoding the page or building a tree.
+    :param page: requests.get page
+    :param base_url: Practiscore address
+    :return: url
+    :rtype: str
+    """
+    content = page.content
+    prefix = (base_url + '/reports/web').encode()
+    start = content.find(prefix)
+    while start != -1:
+        # only counts if it is the href of the enclosing <a> tag
+        tag = content.rfind(b'<', 0, start)
+        link = _anchor_href.match(content, tag) if tag != -1 else None
+        if link is not None and link.start(1) == start:
+            return html.unescape(link.group(1).decode('utf-8', 'replace'))
+        start = content.find(prefix, start + 1)
+    raise IndexError('PRACTISCORE: No web report link.')
+
+
+def webreport_tree(page, base_url=practiscore_url):
     """
-    Returns the URL for the Web Report
+    Returns the URL for the Web Report from a full lxml tree of the page, reference for webreport
     :param page: requests.get page
+    :param base_url: Practiscore address
     :return: url
     :rtype: str
     """
@@ -152,13 +176,13 @@ def webreport(page):
     tree = etree.parse(StringIO(html), parser=parser)
     refs = tree.xpath("//a")
     links = [link.get('href', 'Web Report') for link in refs]
-    return [l for l in links if l.startswith('https://practiscore.com/reports/web')][0]
+    return [l for l in links if l.startswith(base_url + '/reports/web')][0]
 
 
 def isuspsa(file):
     with open(file, 'r', encoding='utf-8') as f:
-        line = [line for line in f if 'E 1,' in line]
-    line = line[0].split(",")
+        line = next((line for line in f if 'E 1,' in line), '')
+    line = line.split(",")
     if line[1].isalnum() is True:
         if line[1].isdigit() is True or line[1].isalpha() is True:
             return False
@@ -168,58 +192,186 @@ def isuspsa(file):
 
 def islevel2(file, level=2):
     with open(file, 'r', encoding='utf-8') as f:
-        lines = f.readlines()
-    for line in lines:
-        if level == 2:
-            if "Level II" in line or "Level III" in line:
-                return True
-        if level == 3:
-            if "Level III" in line:
-                return True
+        for line in f:
+            if level == 2:
+                if "Level II" in line or "Level III" in line:
+                    return True
+            if level == 3:
+                if "Level III" in line:
+                    return True
     return False
 
 
 def islevel3(file):
     with open(file, 'r', encoding='utf-8') as f:
-        lines = f.readlines()
-        for line in lines:
+        for line in f:
             if "Level III" in line:
                 return True
         return False
 
 
-def txt_to_json(file):
+def json_file(file):
     """
-    Converts practiscore txt file to json
+    File path of the .json conversion of a practiscore.txt file
     """
     match_id = file.split('/')[-1].strip('.txt')
-    jfile = root + '/Data/jsonFiles/' + match_id + '.json'
-    header = json_header(file=file)
-    overall = json_overall(file)
-    stages = json_stages(file)
-    scores = json_scores(file)
+    return root + '/Data/jsonFiles/' + match_id + '.json'
+
+
+def txt_to_json(file, compact=False):
+    """
+    Converts practiscore txt file to json
+
+    Parameters
+    -------
+    file : str
+        file path to .txt file
+    compact : bool
+        write the json without indentation
+
+    The match is added to the match index, and with parquet_store set also written to the parquet store
+    """
+    jfile = json_file(file)
+    records = read_records(file)
 
-    filehandler.new_json(jfile, header)
-    filehandler.add_to_json(jfile, overall)
-    filehandler.add_to_json(jfile, stages)
-    filehandler.add_to_json(jfile, scores)
+    data = json_header(file=file, records=records)
+    data.update(json_overall(file, records=records))
+    data.update(json_stages(file, records=records))
+    data.update(json_scores(file, records=records))
+    filehandler.write_json(jfile, data, compact=compact)
+    matchindex.index_match(data, jfile)
+    if parquet_store is True:
+        columnar.write_match(data)
 
 
-def json_header(file):
+def info_record(line):
     """
-    JSON: get the $INFO header from practiscore.txt file
+    $INFO line: [key, value]
+    """
+    line = line.strip('$INFO ')
+    line = line.strip('\n')
+    return line.split(':')
+
+
+def overall_record(line):
     """
+    E line: overall result of a competitor
+    """
+    line = line.strip('E ')
+    line = line.strip('\n')
+    line = line.split(',')
+
+    try:
+        points = float(line[10])
+    except:
+        points = 0
+
+    return {
+        'competitor': int(line[0]),
+        'uspsa_num': line[1],
+        'firstname': line[2],
+        'lastname': line[3],
+        'disqualify': True if line[4].lower() == 'yes' else False,
+        'class': line[8],
+        'division': line[9],
+        'match_points': points,
+        'place': int(line[11]),
+        'percent': None,
+        'power_factor': line[12],
+        'female': True if line[33].lower() == 'yes' else False,
+        'age': line[34],
+        'law': True if line[35].lower() == 'yes' else False,
+        'military': True if line[36].lower() == 'yes' else False
+    }
+
+
+def stage_record(line):
+    """
+    G line: stage info
+    """
+    line = line.strip('G ')
+    line = line.strip('\n')
+    line = line.split(',')
+
+    return {
+        'number': int(line[0]),
+        'name': line[6],
+        'min_rounds': int(line[2]),
+        'max_points': int(line[3]),
+        'classifier': True if line[4].lower() == 'yes' else False,
+        'classifier_number': line[5],
+        'scoring': line[7]
+    }
+
+
+def score_record(line):
+    """
+    I line: stage score of a competitor
+    """
+    line = line.strip('I ')
+    line = line.strip('\n')
+    line = line.split(',')
+
+    return {
+        'stage': int(line[1]),
+        'competitor': int(line[2]),
+        'disqualify': True if line[3].lower() == 'yes' else False,
+        'dnf': True if line[4].lower() == 'yes' else False,
+        'A': int(line[5]),
+        'B': int(line[6]),
+        'C': int(line[7]),
+        'D': int(line[8]),
+        'M': int(line[9]),
+        'NS': int(line[10]),
+        'procedurals': int(line[11]),
+        'penalties': int(line[19]),
+        'time': float(line[25]),
+        'total_points': int(line[27]),
+        'hitfactor': float(line[28]),
+        'stage_points': float(line[29]),
+        'stage_place': int(line[30])
+    }
+
+
+# Record type (first word of the line) and the builder that parses it
+record_builders = {
+    '$INFO': info_record,
+    'E': overall_record,
+    'G': stage_record,
+    'I': score_record
+}
+
+
+def read_records(file):
+    """
+    Reads a practiscore.txt file in a single pass, routing every record to its builder
+
+    Parameters
+    -------
+    file : str
+        file path to .txt file
+
+    Returns
+    -------
+    records : dict
+        {record type: list of parsed records} for $INFO, E, G and I lines, in file order
+    """
+    records = {key: list() for key in record_builders}
     with open(file, 'r', encoding='utf-8') as f:
-        lines = f.readlines()
+        for line in f:
+            key = line.split(' ', 1)[0]
+            if key in record_builders:
+                records[key].append(record_builders[key](line))
+    return records
 
-    info_list = list()
-    for line in lines:
-        items = line.split(" ")
-        if items[0] == '$INFO':
-            line = line.strip('$INFO ')
-            line = line.strip('\n')
-            info = line.split(':')
-            info_list.append(info)
+
+def json_header(file, records=None):
+    """
+    JSON: get the $INFO header from practiscore.txt file
+    """
+    if records is None:
+        records = read_records(file)
+    info_list = records['$INFO']
 
     def get_info(key, info):
         for element in info:
@@ -248,177 +400,49 @@ def json_header(file):
     return data
 
 
-def json_overall(file):
+def json_overall(file, records=None):
     """
     JSON: get the overall results from practiscore.txt file
     """
-    with open(file, 'r', encoding='utf-8') as f:
-        lines = f.readlines()
-
-    overall_list = list()
-    for line in lines:
-        items = line.split(" ")
-        if items[0] == 'E':
-            line = line.strip('E ')
-            line = line.strip('\n')
-            line = line.split(',')
-
-            try:
-                points = float(line[10])
-            except:
-                points = 0
-
-            overall_list.append({
-                'competitor': int(line[0]),
-                'uspsa_num': line[1],
-                'firstname': line[2],
-                'lastname': line[3],
-                'disqualify': True if line[4].lower() == 'yes' else False,
-                'class': line[8],
-                'division': line[9],
-                'match_points': points,
-                'place': int(line[11]),
-                'percent': None,
-                'power_factor': line[12],
-                'female': True if line[33].lower() == 'yes' else False,
-                'age': line[34],
-                'law': True if line[35].lower() == 'yes' else False,
-                'military': True if line[36].lower() == 'yes' else False
-            })
-
-    df = pd.DataFrame(overall_list)
-    for score in overall_list:
-        pct = None
-        if score['division'] == 'Carry Optics':
-            try:
-                pct = np.round(score['match_points'] /
-                               df.loc[df['division'] == 'Carry Optics']['match_points'].max() * 100, 2)
-            except:
-                pct = 0
-
-        if score['division'] == 'Open':
-            try:
-                pct = np.round(score['match_points'] /
-                               df.loc[df['division'] == 'Open']['match_points'].max() * 100, 2)
-            except:
-                pct = 0
-
-        if score['division'] == 'Limited':
-            try:
-                pct = np.round(score['match_points'] /
-                               df.loc[df['division'] == 'Limited']['match_points'].max() * 100, 2)
-            except:
-                pct = 0
-
-        if score['division'] == 'Limited 10':
-            try:
-                pct = np.round(score['match_points'] /
-                               df.loc[df['division'] == 'Limited 10']['match_points'].max() * 100, 2)
-            except:
-                pct = 0
-
-        if score['division'] == 'PCC':
-            try:
-                pct = np.round(score['match_points'] /
-                               df.loc[df['division'] == 'PCC']['match_points'].max() * 100, 2)
-            except:
-                pct = 0
-
-        if score['division'] == 'Production':
-            try:
-                pct = np.round(score['match_points'] /
-                               df.loc[df['division'] == 'Production']['match_points'].max() * 100, 2)
-            except:
-                pct = 0
-
-        if score['division'] == 'Single Stack':
-            try:
-                pct = np.round(score['match_points'] /
-                               df.loc[df['division'] == 'Single Stack']['match_points'].max() * 100, 2)
-            except:
-                pct = 0
-
-        if score['division'] == 'Revolver':
-            try:
-                pct = np.round(score['match_points'] /
-                               df.loc[df['division'] == 'Revolver']['match_points'].max() * 100, 2)
-            except:
-                pct = 0
-
-        score.update({'percent': pct})
+    if records is None:
+        records = read_records(file)
+    overall_list = records['E']
+
+    # percent of the division winner's match points, a division whose best score is 0 gets 0
+    if overall_list:
+        df = pd.DataFrame(overall_list, columns=['division', 'match_points'])
+        hundo = df.groupby('division', sort=False)['match_points'].transform('max').to_numpy()
+        points = df['match_points'].to_numpy(dtype=float)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            percent = np.where(hundo > 0, np.round(points / hundo * 100, 2), 0)
+        for score, pct in zip(overall_list, percent.tolist()):
+            score.update({'percent': pct})
 
     return {'overall': overall_list}
 
 
-def json_stages(file):
+def json_stages(file, records=None):
     """
     JSON: get the stage info from practiscore.txt file
     """
-    with open(file, 'r', encoding='utf-8') as f:
-        lines = f.readlines()
-
-    stage_list = list()
-    for line in lines:
-        items = line.split(" ")
-        if items[0] == 'G':
-            line = line.strip('G ')
-            line = line.strip('\n')
-            line = line.split(',')
+    if records is None:
+        records = read_records(file)
+    return {'stages': records['G']}
 
-            stage_list.append({
-                'number': int(line[0]),
-                'name': line[6],
-                'min_rounds': int(line[2]),
-                'max_points': int(line[3]),
-                'classifier': True if line[4].lower() == 'yes' else False,
-                'classifier_number': line[5],
-                'scoring': line[7]
-            })
 
-    return {'stages': stage_list}
-
-
-def json_scores(file):
+def json_scores(file, records=None):
     """
     JSON: get the scores for each stage from practiscore.txt file
     """
-    with open(file, 'r', encoding='utf-8') as f:
-        lines = f.readlines()
-
-    score_list = list()
-    for line in lines:
-        items = line.split(" ")
-        if items[0] == 'I':
-            line = line.strip('I ')
-            line = line.strip('\n')
-            line = line.split(',')
-
-            score_list.append({
-                'stage': int(line[1]),
-                'competitor': int(line[2]),
-                'disqualify': True if line[3].lower() == 'yes' else False,
-                'dnf': True if line[4].lower() == 'yes' else False,
-                'A': int(line[5]),
-                'B': int(line[6]),
-                'C': int(line[7]),
-                'D': int(line[8]),
-                'M': int(line[9]),
-                'NS': int(line[10]),
-                'procedurals': int(line[11]),
-                'penalties': int(line[19]),
-                'time': float(line[25]),
-                'total_points': int(line[27]),
-                'hitfactor': float(line[28]),
-                'stage_points': float(line[29]),
-                'stage_place': int(line[30])
-            })
-
-    return {'scores': score_list}
+    if records is None:
+        records = read_records(file)
+    return {'scores': records['I']}
 
 
 def noclassifier(file):
     """
-    Recalculates match results after removing the classifier.
+    Recalculates match results after removing the classifier. Results are cached by file and modification time, each
+    call returns its own copy.
 
     Parameters
     -------
@@ -430,87 +454,69 @@ def noclassifier(file):
     match_scores : dict
         json format
     """
+    return copy.deepcopy(_noclassifier(file, os.path.getmtime(file)))
+
+
+@functools.lru_cache(maxsize=noclassifier_cache_size)
+def _noclassifier(file, mtime):
     f = open(file)
     data = json.load(f)
     f.close()
 
     competitors = data['overall']
-    divisions = list()
-    for competitor in competitors:
-        competitor['match_points'] = 0
-        if competitor['division'] not in divisions:
-            divisions.append(competitor['division'])
-    divisions = tuple(divisions)
-
-    stages = data['stages']
-    stages_not_classifier = list()
-    for stage in stages:
-        if stage['classifier'] is False:
-            stages_not_classifier.append(stage['number'])
-    stages_not_classifier = tuple(stages_not_classifier)
-
-    scores = data['scores']
-    for score in scores:
-        if score['stage'] in stages_not_classifier:
-            competitors[score["competitor"] - 1]['match_points'] += score['stage_points']
-
-    def hundo(results, div):
-        max_score = 0
-        for result in results:
-            if result['division'] == div and result['match_points'] > max_score:
-                max_score = result['match_points']
-        return max_score
-
-    hundos = list()
-    for division in divisions:
-        hundos.append(hundo(competitors, division))
-    hundos = tuple(hundos)
-
-    for competitor in competitors:
-        try:
-            competitor['percent'] = competitor['match_points'] / hundos[divisions.index(competitor['division'])] * 100
-        except ZeroDivisionError:
-            competitor['percent'] = 0
-
+    stages_not_classifier = [stage['number'] for stage in data['stages'] if stage['classifier'] is False]
+
+    # match points from the scores of the remaining stages
+    scores = [score for score in data['scores'] if score['stage'] in stages_not_classifier]
+    points = np.bincount(np.fromiter((score['competitor'] - 1 for score in scores), dtype=int, count=len(scores)),
+                         weights=np.fromiter((score['stage_points'] for score in scores), dtype=float,
+                                             count=len(scores)),
+                         minlength=len(competitors))
+
+    # division hundos, a division without points gets 0 percent
+    divisions = dict()
+    division = np.fromiter((divisions.setdefault(competitor['division'], len(divisions)) for competitor in competitors),
+                           dtype=int, count=len(competitors))
+    hundos = np.zeros(len(divisions))
+    np.maximum.at(hundos, division, points)
+    hundo = hundos[division]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        percent = np.where(hundo != 0, points / hundo * 100, 0)
+
+    # divisions in order of appearance, best percent first
+    order = np.lexsort((-percent, division))
+    start = np.searchsorted(division[order], np.arange(len(divisions)))
+    place = np.arange(len(order)) - start[division[order]] + 1
+
+    points, percent = points.tolist(), percent.tolist()
     match_results = list()
-    for division in divisions:
-        div_competitors = list()
-        for competitor in competitors:
-            if competitor['division'] == division:
-                div_competitors.append(competitor)
-        div_competitors = sorted(div_competitors, key=lambda d: d['percent'], reverse=True)
-        for i in range(0, len(div_competitors)):
-            div_competitors[i]['place'] = i + 1
-            match_results.append(div_competitors[i])
-
-    new_stages = list()
-    for stage in stages:
-        if stage['number'] in stages_not_classifier:
-            new_stages.append(stage)
-    data['stages'] = new_stages
+    for i, rank in zip(order.tolist(), place.tolist()):
+        competitor = competitors[i]
+        competitor['match_points'] = points[i]
+        competitor['percent'] = percent[i]
+        competitor['place'] = rank
+        match_results.append(competitor)
+
+    data['stages'] = [stage for stage in data['stages'] if stage['number'] in stages_not_classifier]
     data['overall'] = match_results
     return data
 
 
-def mmr_format(file, division='Carry Optics', match_type='USPSA', classifiers=ignore_classifier):
+def match_data(file, classifiers=ignore_classifier):
     """
-    Converts Practiscore match results .json to match results for the specified division in a pandas Dataframe
+    Loads Practiscore match results .json
 
     Parameters
     -------
     file : str
         file path to .json file
-    division : str
-        division name
-    match_type : str
-        Match type
     classifiers : bool
         Ignore classifier and recalculate scores
 
     Returns
     -------
-    competitors : list
-        competitor class with relevant match info
+    data : dict
+        json format
     """
     if classifiers is False:
         f = open(file)
@@ -518,7 +524,37 @@ def mmr_format(file, division='Carry Optics', match_type='USPSA', classifiers=ig
         f.close()
     else:
         data = noclassifier(file)
+    return data
+
+
+def match_divisions(data):
+    """
+    Division names of a match in order of appearance, compared case-insensitively
+    """
+    divisions = dict()
+    for score in data['overall']:
+        divisions.setdefault(score['division'].lower(), score['division'])
+    return list(divisions.values())
+
+
+def competitors_from_data(data, division='Carry Optics', match_type='USPSA'):
+    """
+    Match results for the specified division from loaded match data
+
+    Parameters
+    -------
+    data : dict
+        json format, see match_data
+    division : str
+        division name
+    match_type : str
+        Match type
 
+    Returns
+    -------
+    competitors : list
+        competitor class with relevant match info
+    """
     competitors = list()
     for score in data['overall']:
         if score['division'].lower() == division.lower():
@@ -547,6 +583,29 @@ def mmr_format(file, division='Carry Optics', match_type='USPSA', classifiers=ig
     return competitors
 
 
+def mmr_format(file, division='Carry Optics', match_type='USPSA', classifiers=ignore_classifier):
+    """
+    Converts Practiscore match results .json to match results for the specified division in a pandas Dataframe
+
+    Parameters
+    -------
+    file : str
+        file path to .json file
+    division : str
+        division name
+    match_type : str
+        Match type
+    classifiers : bool
+        Ignore classifier and recalculate scores
+
+    Returns
+    -------
+    competitors : list
+        competitor class with relevant match info
+    """
+    return competitors_from_data(match_data(file, classifiers), division, match_type)
+
+
 def isnumberfake(member_number):
     fake_num = ['', 'NA', 'N/A', 'NONE', '666', '69']
     if member_number in fake_num:
@@ -0,0 +1,347 @@
+from config import *
+from Application import rating, elo, elommr as mmr
+from Utilities import practiscore as ps
+import tracemalloc
+import types
+
+
+def synthetic_match(competitor_count, seed=0, fractional=False):
+    """
+    Random match results with win/loss rankings and pre-match ratings
+
+    Parameters
+    ----------
+    competitor_count : int
+        number of competitors in division
+    seed : int
+        random seed
+    fractional : bool
+        draw ratings and uncertainties as any float instead of whole numbers
+
+    Returns
+    ----------
+    scores : list
+        list of Competitors at match
+    """
+    rng = np.random.default_rng(seed)
+    percent = np.sort(rng.uniform(20, 100, competitor_count))[::-1]
+    percent[0] = 100
+
+    scores = list()
+    for i in range(competitor_count):
+        competitor = rating.Competitor()
+        competitor.first = 'First' + str(i)
+        competitor.last = 'Last' + str(i)
+        competitor.place = i + 1
+        competitor.percent = float(percent[i])
+        if fractional:
+            competitor.rating = float(rng.normal(1200, 300))
+            competitor.uncertainty = float(rng.uniform(80, noob_uncertainty))
+        else:
+            competitor.rating = float(np.round(rng.normal(1200, 300)))
+            competitor.uncertainty = float(rng.choice([noob_uncertainty, 200, 120]))
+        competitor.number_of_matches = int(rng.integers(0, 2 * noob_placement))
+        scores.append(competitor)
+    return rating.win_loss_ranking(scores)
+
+
+def solver_regression(competitor_count=100, matches=10, method='normal', fractional=False, tolerance=1):
+    """
+    Checks the newton solver against the grid solver for every competitor and times both
+
+    Parameters
+    ----------
+    competitor_count : int
+        number of competitors per match
+    matches : int
+        number of random matches
+    method : str
+        normal: Gaussian distribution
+        logistic: logistic distribution
+    fractional : bool
+        non-integer ratings and uncertainties
+    tolerance : float
+        maximum allowed difference in rating points
+    """
+    x = np.linspace(rating_min, rating_max, rating_max - rating_min + 1)
+    worst, t_grid, t_newton = 0, 0, 0
+    for seed in range(matches):
+        scores = synthetic_match(competitor_count, seed, fractional)
+
+        t = time.time()
+        grid = np.array([c.performance for c in rating.performance_rating(scores, method=method, solver='grid', cache=None)])
+        t_grid += time.time() - t
+        t = time.time()
+        newton = np.array([c.performance for c in rating.performance_rating(scores, method=method, solver='newton', cache=None)])
+        t_newton += time.time() - t
+        worst = max(worst, np.max(np.abs(grid - newton)))
+
+    print('Performance (%s, %s x %s%s): max difference %s, grid %s s, newton %s s' %
+          (method, matches, competitor_count, ', fractional' if fractional else '', np.round(worst, 3),
+           np.round(t_grid, 3), np.round(t_newton, 3)))
+    assert worst <= tolerance
+
+    worst = 0
+    rng = np.random.default_rng(0)
+    for _ in range(100 * matches):
+        skill, uncertainty = rng.uniform(rating_min, rating_max), rng.choice([noob_uncertainty, 200, 120])
+        performance, match_uncert = rng.uniform(rating_min, rating_max), rng.uniform(120, noob_uncertainty)
+        distribution = mmr.pdf(x, skill, uncertainty, method=method) * mmr.pdf(x, performance, match_uncert, method=method)
+        if np.max(distribution) < np.finfo(float).tiny:
+            continue
+
+        def posterior(val, rows):
+            return mmr.log_pdf_prime(val, skill, uncertainty, method=method) + \
+                   mmr.log_pdf_prime(val, performance, match_uncert, method=method), \
+                   mmr.log_pdf_prime2(val, skill, uncertainty, method=method) + \
+                   mmr.log_pdf_prime2(val, performance, match_uncert, method=method)
+
+        roots = mmr.solve(posterior, rating_min, rating_max)[0]
+        if roots.size > 0:
+            mode = roots[0]
+        else:
+            mode = rating_max if posterior(np.array([rating_max]), None)[0][0] > 0 else rating_min
+        worst = max(worst, np.abs(x[np.argmax(distribution)] - mode))
+
+    print('Posterior (%s): max difference %s' % (method, np.round(worst, 3)))
+    assert worst <= tolerance
+
+
+def template_benchmark(competitor_count=200, method='normal', repeat=10):
+    """
+    Times the shifted-template win/loss curves against direct evaluation and reports their largest difference
+
+    Parameters
+    ----------
+    competitor_count : int
+        number of opponents
+    method : str
+        normal: Gaussian distribution
+        logistic: logistic distribution
+    repeat : int
+        number of runs
+    """
+    x = np.linspace(rating_min, rating_max, rating_max - rating_min + 1)
+    rng = np.random.default_rng(0)
+    skill = rng.uniform(rating_min, rating_max, (competitor_count, 1))
+    uncertainty = rng.choice([noob_uncertainty, 200, 120], (competitor_count, 1)).astype(float)
+
+    for name, exact, template in (('win', mmr.win_distribution, mmr.win_distribution_template),
+                                  ('loss', mmr.loss_distribution, mmr.loss_distribution_template)):
+        for rounded in (True, False):
+            mean = np.round(skill) if rounded else skill
+            template(x, mean, uncertainty, method=method)
+            t = time.time()
+            for _ in range(repeat):
+                a = exact(x, mean, uncertainty, method=method)
+            t_exact = (time.time() - t) / repeat
+            t = time.time()
+            for _ in range(repeat):
+                b = template(x, mean, uncertainty, method=method)
+            t_template = (time.time() - t) / repeat
+
+            finite = np.isfinite(a)
+            assert np.array_equal(finite, np.isfinite(b))
+            print('%s curves (%s, %s means): max difference %s, exact %s ms, template %s ms' %
+                  (name, method, 'integer' if rounded else 'fractional', np.max(np.abs(a - b)[finite]),
+                   np.round(t_exact * 1000, 3), np.round(t_template * 1000, 3)))
+
+
+def ratio_distributions(x, mean, scale, method='normal'):
+    """
+    Win and loss curves as plain pdf / cdf ratios (the formulation elommr used before its log-space primitives),
+    reference for primitive_benchmark
+    """
+    with np.errstate(all='ignore'):
+        if method == 'logistic':
+            d = np.sqrt(3) / np.pi * scale
+            u = (x - mean) / (scale * np.sqrt(2))
+            density = 0.25 / d * 2 * np.exp(u) / (np.exp(2 * u) + 1)
+            probability = 0.5 * (1 + np.tanh((x - mean) / (2 * d)))
+        else:
+            density = 1 / (scale * np.sqrt(2 * np.pi)) * np.exp(-0.5 * ((x - mean) / scale) ** 2)
+            probability = 0.5 * (1 + sp.special.erf((x - mean) / (scale * np.sqrt(2))))
+
+        edge, y2, m = mmr.win_linear_region(mean, scale, method=method)
+        win = np.where(x < edge, m * (x - edge) + y2, density / probability)
+        edge, y2, m = mmr.loss_linear_region(mean, scale, method=method)
+        loss = np.where(x <= edge, density / (probability - 1), m * (x - edge) + y2)
+    return win, loss
+
+
+def primitive_benchmark(competitor_count=200, method='normal', repeat=10):
+    """
+    Times the elommr win/loss curves, with and without out= and scratch= buffers, against the pdf / cdf ratio
+    formulation over the full rating grid and reports their largest difference and the memory each call allocates
+
+    Parameters
+    ----------
+    competitor_count : int
+        number of opponents
+    method : str
+        normal: Gaussian distribution
+        logistic: logistic distribution
+    repeat : int
+        number of runs
+    """
+    x = np.linspace(rating_min, rating_max, rating_max - rating_min + 1)
+    rng = np.random.default_rng(0)
+    skill = rng.uniform(rating_min, rating_max, (competitor_count, 1))
+    uncertainty = rng.choice([noob_uncertainty, 200, 120, 40], (competitor_count, 1)).astype(float)
+    buffer, scratch = np.empty((competitor_count, len(x))), np.empty((competitor_count, len(x)))
+
+    t = time.time()
+    for _ in range(repeat):
+        win, loss = ratio_distributions(x, skill, uncertainty, method=method)
+    t_ratio = (time.time() - t) / repeat
+    t = time.time()
+    for _ in range(repeat):
+        new_win = mmr.win_distribution(x, skill, uncertainty, method=method)
+        new_loss = mmr.loss_distribution(x, skill, uncertainty, method=method)
+    t_new = (time.time() - t) / repeat
+    t = time.time()
+    for _ in range(repeat):
+        mmr.win_distribution(x, skill, uncertainty, method=method, out=buffer, scratch=scratch)
+        mmr.loss_distribution(x, skill, uncertainty, method=method, out=buffer, scratch=scratch)
+    t_out = (time.time() - t) / repeat
+
+    peak = list()
+    for buffers in (dict(), dict(out=buffer, scratch=scratch)):
+        tracemalloc.start()
+        mmr.win_distribution(x, skill, uncertainty, method=method, **buffers)
+        peak.append(tracemalloc.get_traced_memory()[1] / buffer.nbytes)
+        tracemalloc.stop()
+
+    assert np.all(np.isfinite(new_win)) and np.all(np.isfinite(new_loss))
+    finite = np.isfinite(win) & np.isfinite(loss)
+    worst = max(np.max(np.abs(win - new_win)[finite]), np.max(np.abs(loss - new_loss)[finite]))
+    print('Primitives (%s): max difference %s, ratio %s ms, log-space %s ms, with buffers %s ms, '
+          'allocated %s curve arrays, with buffers %s' %
+          (method, worst, np.round(t_ratio * 1000, 3), np.round(t_new * 1000, 3), np.round(t_out * 1000, 3),
+           np.round(peak[0], 2), np.round(peak[1], 2)))
+
+
+def elo_batch_benchmark(matches=2000, min_size=5, max_size=60, seed=0):
+    """
+    Throughput of per-match elo.rating_adjustment calls against one elo.rating_adjustment_batch call over a season of
+    small club matches, checking both give the same ratings
+
+    Parameters
+    ----------
+    matches : int
+        number of matches
+    min_size : int
+        smallest field
+    max_size : int
+        largest field
+    seed : int
+        random seed
+    """
+    rng = np.random.default_rng(seed)
+    sizes = rng.integers(min_size, max_size + 1, matches)
+    ratings = [rng.uniform(rating_min, 2500, size) for size in sizes]
+    scores = [rng.uniform(20, 100, size) for size in sizes]
+
+    t = time.time()
+    single = np.concatenate([elo.rating_adjustment(r, s) for r, s in zip(ratings, scores)])
+    t_single = time.time() - t
+
+    t = time.time()
+    packed_ratings, offsets = elo.pack_matches(ratings)
+    packed_scores, _ = elo.pack_matches(scores)
+    batch = elo.rating_adjustment_batch(packed_ratings, packed_scores, offsets)
+    t_batch = time.time() - t
+
+    assert np.array_equal(single, batch)
+    print('Elo (%s matches, %s competitors): per-match %s matches/s, batch %s matches/s' %
+          (matches, offsets[-1], int(matches / t_single), int(matches / t_batch)))
+
+
+def synthetic_results_page(links=500, seed=0):
+    """
+    Practiscore-like results page with many links and a web report link part way down
+
+    Parameters
+    ----------
+    links : int
+        number of <a> tags
+    seed : int
+        random seed
+
+    Returns
+    ----------
+    page : bytes
+        page content
+    """
+    rng = np.random.default_rng(seed)
+    report = int(rng.integers(links // 2, links))
+    body = list()
+    for i in range(links):
+        if i == report:
+            body.append('<li><a class="btn" href="https://practiscore.com/reports/web/%d?x=1&amp;y=2">Web Report</a></li>'
+                        % rng.integers(1e5, 1e6))
+        else:
+            body.append('<li><a href="/results/new/%d" title="Match %d">Match %d</a><span>%s</span></li>'
+                        % (i, i, i, 'x' * int(rng.integers(50, 300))))
+    return ('<html><head><title>Results</title></head><body><ul>' + ''.join(body) + '</ul></body></html>').encode()
+
+
+def webreport_benchmark(directory=None, repeat=20):
+    """
+    Times webreport against the lxml tree version and checks they return the same link
+
+    Parameters
+    ----------
+    directory : str
+        folder of saved results pages, None uses synthetic pages
+    repeat : int
+        number of runs per page
+    """
+    if directory is None:
+        pages = [synthetic_results_page(seed=seed) for seed in range(10)]
+    else:
+        pages = list()
+        for file in os.listdir(directory):
+            with open(os.path.join(directory, file), 'rb') as f:
+                pages.append(f.read())
+    pages = [types.SimpleNamespace(content=page) for page in pages]
+
+    t_scan, t_tree = 0, 0
+    for page in pages:
+        try:
+            expected = ps.webreport_tree(page)
+        except IndexError:
+            expected = None
+
+        t = time.time()
+        for _ in range(repeat):
+            try:
+                link = ps.webreport(page)
+            except IndexError:
+                link = None
+        t_scan += time.time() - t
+        t = time.time()
+        for _ in range(repeat):
+            try:
+                ps.webreport_tree(page)
+            except IndexError:
+                pass
+        t_tree += time.time() - t
+        assert link == expected
+
+    runs = len(pages) * repeat
+    print('Web report (%s pages): scan %s ms, lxml %s ms per page' %
+          (len(pages), np.round(t_scan / runs * 1000, 3), np.round(t_tree / runs * 1000, 3)))
+
+
+if __name__ == '__main__':
+    for fractional in (False, True):
+        for competitor_count in (30, 100, 300):
+            solver_regression(competitor_count, method='normal', fractional=fractional)
+            solver_regression(competitor_count, method='logistic', fractional=fractional)
+    template_benchmark(method='normal')
+    template_benchmark(method='logistic')
+    primitive_benchmark(method='normal')
+    primitive_benchmark(method='logistic')
+    elo_batch_benchmark()
+    webreport_benchmark()
@@ -15,9 +15,11 @@ root = os.path.dirname(os.path.abspath(__file__))
 
 ratings_db = root + r'\Data\eloratings.db'
 classifiers_db = root + r'\Data\classifiers.db'
+matches_db = root + r'\Data\matches.db'
 
 noob_skill = 1000
 noob_uncertainty = 350
+uncertainty_min = 80
 noob_weight = 0.1
 noob_placement = 5
 rating_min = 100
@@ -26,4 +28,19 @@ percent_factor = 0.05
 stage_count_factor = 0.15
 competitor_count_factor = 0.01
 mmr_method = 'normal'
+mmr_solver = 'grid'
+curve_cache_size = 1024
 ignore_classifier = True
+noclassifier_cache_size = 8
+conversion_workers = os.cpu_count()
+rating_workers = os.cpu_count()
+parquet_store = False
+parquet_dir = root + '/Data/parquetFiles/'
+parquet_batch_size = 500
+practiscore_url = 'https://practiscore.com'
+download_workers = 8
+download_rate = 5
+download_retries = 4
+download_timeout = 30
+negative_cache = root + r'\Data\negative_cache.json'
+negative_cache_ttl = None
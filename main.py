@@ -2,13 +2,14 @@ from Utilities import practiscore as ps
 from Utilities import filehandler as fh
 from config import *
 
-print("Let's get this thing on the hump!")
-print()
+if __name__ == '__main__':
+    print("Let's get this thing on the hump!")
+    print()
 
-path = root + "/Data/txtFiles/"
-fh.convert_to_json(path)
+    path = root + "/Data/txtFiles/"
+    fh.convert_to_json(path)
 
-# ps.download_match(199230)
+    # ps.download_match(199230)
 
-print()
-print('Target Destroyed')
+    print()
+    print('Target Destroyed')
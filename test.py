@@ -2,7 +2,8 @@ import matplotlib.pyplot as plt
 import time
 from config import *
 from Application import database, rating, elommr as mmr
-from Utilities import practiscore as ps
+from Application.store import RatingStore
+from Utilities import practiscore as ps, matchindex
 
 division = 'Carry Optics'
 match_num = 205465
@@ -16,16 +17,17 @@ file = root + '/Data/jsonFiles/' + str(match_num) + '.json'
 
 
 path = root + '/Data/jsonFiles/'
-dir_list = os.listdir(path)
+matchindex.update(path)
 t = time.time()
 
-for file in dir_list:
-    t2 = time.time()
-    print('Match:', file)
-    file = path + file
-    rating.match_update(file, division)
-    print('Elapsed Time (s): %s' % (np.round(time.time() - t, 3)))
-    print('Elapsed Time (s) for match: %s' % (np.round(time.time() - t2, 3)))
+with RatingStore() as store:
+    for match in matchindex.matches(division=division):
+        t2 = time.time()
+        print('Match:', match['practiscore_id'], match['date'])
+        file = match['file']
+        rating.match_update(file, division, store=store)
+        print('Elapsed Time (s): %s' % (np.round(time.time() - t, 3)))
+        print('Elapsed Time (s) for match: %s' % (np.round(time.time() - t2, 3)))
 
 
 ## Ranked list
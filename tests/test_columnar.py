@@ -0,0 +1,59 @@
+import json
+import os
+
+import pytest
+
+pytest.importorskip('pyarrow')
+
+from Utilities import columnar
+
+
+def match(match_id, points=50.0, divisions=('Open', 'Limited')):
+    overall = [{'competitor': i + 1, 'division': division, 'firstname': 'First', 'lastname': division,
+                'uspsa_num': 'A%d' % i, 'match_points': points, 'place': 1, 'percent': 100.0}
+               for i, division in enumerate(divisions)]
+    return {'practiscore_id': match_id, 'unix': 1577836800 + match_id, 'date': '01/02/2020',
+            'match_name': 'Match %d' % match_id, 'club': 'Club', 'club_code': 'CLB', 'level': 1,
+            'overall': overall, 'stages': [{'number': 1, 'name': 'Stage 1', 'classifier': False}],
+            'scores': [{'stage': 1, 'competitor': c['competitor'], 'stage_points': points} for c in overall]}
+
+
+def parquet_files(directory):
+    return [os.path.join(folder, file) for folder, _, files in os.walk(directory) for file in files
+            if file.endswith('.parquet')]
+
+
+def test_import_writes_one_file_per_partition_per_batch(tmp_path):
+    source, store = tmp_path / 'json', str(tmp_path / 'store')
+    source.mkdir()
+    for match_id in range(1, 11):
+        (source / ('%d.json' % match_id)).write_text(json.dumps(match(match_id)))
+
+    columnar.import_json(str(source), store, batch_size=4)
+
+    # 3 batches, overall and scores in 2 division partitions, stages in 1 year partition
+    assert len(parquet_files(store)) == 3 * (2 + 2 + 1)
+    overall = columnar.load_overall(directory=store)
+    assert sorted(overall['match_id'].unique()) == list(range(1, 11))
+    assert len(overall) == 20
+
+
+def test_rewrite_replaces_a_match_inside_a_batch(tmp_path):
+    store = str(tmp_path / 'store')
+    columnar.write_matches([match(1), match(2), match(3)], store)
+    columnar.write_match(match(2, points=75.0), store)
+
+    overall = columnar.load_overall(directory=store)
+    assert sorted(overall['match_id']) == [1, 1, 2, 2, 3, 3]
+    assert set(overall.loc[overall['match_id'] == 2, 'match_points']) == {75.0}
+    assert set(overall.loc[overall['match_id'] != 2, 'match_points']) == {50.0}
+    assert len(columnar.load_scores(match_ids=[2], directory=store)) == 2
+
+
+def test_delete_removes_emptied_files(tmp_path):
+    store = str(tmp_path / 'store')
+    columnar.write_matches([match(1), match(1, points=60.0)], store)
+    assert set(columnar.load_overall(directory=store)['match_points']) == {60.0}
+
+    columnar.delete_match(1, store)
+    assert parquet_files(store) == []
@@ -0,0 +1,46 @@
+import numpy as np
+
+from Application import rating
+from Application.curves import CurveCache
+from benchmark import synthetic_match
+
+
+def test_cached_performance_matches_uncached_on_fractional_ratings():
+    cache = CurveCache()
+    for seed in range(3):
+        for method in ('normal', 'logistic'):
+            scores = synthetic_match(60, seed, fractional=True)
+            direct = [c.performance for c in rating.performance_rating(scores, method=method, cache=None)]
+            scores = synthetic_match(60, seed, fractional=True)
+            cached = [c.performance for c in rating.performance_rating(scores, method=method, cache=cache)]
+            assert cached == direct
+
+
+def test_cached_curves_are_the_direct_curves():
+    x = np.linspace(100, 3000, 2901)
+    skill, uncertainty = np.array([1234.56, 1234.56, 987.4]), np.array([201.3, 201.3, 350.0])
+    cache = CurveCache()
+    win, loss = cache.get(x, skill, uncertainty)
+    assert cache.misses == 2 and cache.hits == 1
+    np.testing.assert_array_equal(win, rating.mmr.win_distribution(x, skill[:, np.newaxis], uncertainty[:, np.newaxis]))
+    np.testing.assert_array_equal(loss, rating.mmr.loss_distribution(x, skill[:, np.newaxis], uncertainty[:, np.newaxis]))
+
+    win, loss = cache.get(x, skill, uncertainty)
+    assert cache.hits == 4
+    np.testing.assert_array_equal(win[0], win[1])
+
+
+def test_rounded_keys_share_curves():
+    x = np.linspace(100, 3000, 2901)
+    cache = CurveCache(decimals=0)
+    cache.get(x, np.array([1234.4, 1233.6]), np.array([200.2, 199.8]))
+    assert cache.misses == 1 and cache.hits == 1
+
+
+def test_lru_eviction():
+    x = np.linspace(100, 3000, 2901)
+    cache = CurveCache(maxsize=2)
+    cache.get(x, np.array([1000.5, 1100.5, 1200.5]), np.array([200.0, 200.0, 200.0]))
+    assert len(cache) == 2
+    cache.get(x, np.array([1000.5]), np.array([200.0]))
+    assert cache.misses == 4
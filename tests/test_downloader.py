@@ -0,0 +1,147 @@
+import http.server
+import threading
+import time
+
+import pytest
+import requests
+
+from Utilities import downloader
+
+
+class Handler(http.server.BaseHTTPRequestHandler):
+    """
+    Stand-in for Practiscore, answers from the server's routes: {path: [(status, body), ...]}, the last answer repeats
+    """
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests.append((time.monotonic(), self.path))
+            answers = server.routes.get(self.path, [(404, '')])
+            status, body = answers.pop(0) if len(answers) > 1 else answers[0]
+        body = body.replace('{base}', server.base).encode()
+        self.send_response(status)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = http.server.ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    httpd.base = 'http://127.0.0.1:%d' % httpd.server_address[1]
+    httpd.routes, httpd.requests, httpd.lock = dict(), list(), threading.Lock()
+    thread = threading.Thread(target=httpd.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def paths(server):
+    return [path for _, path in server.requests]
+
+
+@pytest.mark.parametrize('status', [500, 502, 503, 504, 429])
+def test_fetch_retries_retry_status(server, status):
+    server.routes['/page'] = [(status, ''), (status, ''), (200, 'ok')]
+    with requests.Session() as session:
+        page = downloader.fetch(session, server.base + '/page', retries=4, backoff=0.01)
+    assert page.status_code == 200 and page.text == 'ok'
+    assert paths(server) == ['/page'] * 3
+
+
+def test_fetch_returns_last_response_when_retries_run_out(server):
+    server.routes['/page'] = [(503, '')]
+    with requests.Session() as session:
+        page = downloader.fetch(session, server.base + '/page', retries=2, backoff=0.01)
+    assert page.status_code == 503
+    assert len(server.requests) == 3
+
+
+def test_fetch_does_not_retry_final_status(server):
+    server.routes['/page'] = [(403, ''), (200, 'ok')]
+    with requests.Session() as session:
+        page = downloader.fetch(session, server.base + '/page', retries=4, backoff=0.01)
+    assert page.status_code == 403
+    assert len(server.requests) == 1
+
+
+def test_fetch_raises_connection_errors_after_retries(server):
+    url = server.base + '/page'
+    server.shutdown()
+    server.server_close()
+    with requests.Session() as session, pytest.raises(requests.ConnectionError):
+        downloader.fetch(session, url, retries=1, backoff=0.01, timeout=1)
+
+
+def test_rate_limit_spaces_requests_over_all_threads(server):
+    server.routes.update({'/results/new/%d' % i: [(404, '')] for i in range(12)})
+    status = downloader.download_all(range(12), workers=4, rate=20, base_url=server.base, cache=None,
+                                     report_every=1000)
+    assert sorted(status['missing']) == list(range(12))
+
+    times = sorted(t for t, _ in server.requests)
+    assert len(times) == 12
+    # no burst, any 5 consecutive arrivals span about 4 intervals, allowing for scheduling jitter
+    assert min(b - a for a, b in zip(times, times[4:])) > 0.8 * 4 / 20
+    assert times[-1] - times[0] > 0.8 * 11 / 20
+
+
+def test_download_all_statuses_and_negative_cache(server, tmp_path):
+    directory, cache = str(tmp_path) + '/', str(tmp_path / 'negative_cache.json')
+    link = '<a class="btn" href="{base}/reports/web/%d">Web Report</a>'
+    server.routes.update({
+        '/results/new/1': [(200, link % 1)], '/reports/web/1': [(503, ''), (200, 'E 1,results')],
+        '/results/new/2': [(404, '')],
+        '/results/new/3': [(200, '<a data-href="{base}/reports/web/3">Web Report</a>')],
+        '/results/new/4': [(200, link % 4)], '/reports/web/4': [(403, '')],
+    })
+
+    status = downloader.download_all([1, 2, 3, 4], workers=2, rate=None, base_url=server.base,
+                                     directory=directory, cache=cache, report_every=1000)
+    assert status == {'downloaded': [1], 'missing': [2], 'not uspsa': [3], 'failed': [4]}
+    assert (tmp_path / '1.txt').read_text() == 'E 1,results'
+    assert sorted(p.name for p in tmp_path.iterdir()) == ['1.txt', 'negative_cache.json']
+
+    # only the failed match is requested again
+    server.requests.clear()
+    status = downloader.download_all([1, 2, 3, 4], workers=2, rate=None, base_url=server.base,
+                                     directory=directory, cache=cache, report_every=1000)
+    assert {key: sorted(value) for key, value in status.items()} == \
+        {'exists': [1], 'cached': [2, 3], 'failed': [4]}
+    assert sorted(paths(server)) == ['/reports/web/4', '/results/new/4']
+
+
+def test_negative_cache_round_trip(tmp_path):
+    file = str(tmp_path / 'negative_cache.json')
+    cache = downloader.NegativeCache(file)
+    cache.add(1, 'missing')
+    cache.add(2, 'level', level=2)
+    cache.save()
+
+    cache = downloader.NegativeCache(file)
+    assert cache.reason(1) == 'missing' and cache.reason('1') == 'missing'
+    assert cache.reason(3) is None
+
+
+def test_negative_cache_level(tmp_path):
+    cache = downloader.NegativeCache(None)
+    cache.add(2, 'level', level=2)
+    assert cache.reason(2, level=2) == 'level'
+    assert cache.reason(2, level=3) == 'level'
+    assert cache.reason(2, level=None) is None
+    assert cache.reason(2, level=1) is None
+
+
+def test_negative_cache_ttl(tmp_path):
+    cache = downloader.NegativeCache(None, ttl=60)
+    cache.add(1, 'missing')
+    cache.add(2, 'missing')
+    cache.entries['2']['timestamp'] -= 120
+    assert cache.reason(1) == 'missing'
+    assert cache.reason(2) is None
+    cache.save()
+    assert list(tmp_path.iterdir()) == []
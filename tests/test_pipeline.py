@@ -0,0 +1,62 @@
+import json
+import sqlite3
+
+import numpy as np
+import pytest
+
+from Application import pipeline
+
+
+def write_match(path, match_id, unix, divisions, rng):
+    overall, scores = list(), list()
+    for division, count in divisions.items():
+        for i in range(count):
+            overall.append({'division': division, 'firstname': 'First%d' % i, 'lastname': division,
+                            'uspsa_num': 'A%d%s' % (i, division[0]), 'match_points': 0, 'percent': 0, 'place': 0})
+    stages = [{'number': stage, 'classifier': stage == 3} for stage in (1, 2, 3)]
+    for competitor in range(1, len(overall) + 1):
+        for stage in (1, 2, 3):
+            scores.append({'competitor': competitor, 'stage': stage, 'stage_points': float(rng.uniform(20, 100))})
+    data = {'match_name': 'Match %d' % match_id, 'date': '2024-01-%02d' % match_id, 'unix': unix,
+            'practiscore_id': match_id, 'club': 'Club', 'club_code': 'CLB', 'level': 1, 'classifiers': 1,
+            'overall': overall, 'stages': stages, 'scores': scores}
+    file = path / ('%d.json' % match_id)
+    file.write_text(json.dumps(data))
+    return str(file)
+
+
+@pytest.fixture
+def matches(tmp_path):
+    rng = np.random.default_rng(0)
+    # listed out of date order, with the division spelled two ways
+    return [write_match(tmp_path, 3, 3000, {'Carry Optics': 6, 'Limited': 5}, rng),
+            write_match(tmp_path, 1, 1000, {'Carry Optics': 8}, rng),
+            write_match(tmp_path, 2, 2000, {'carry optics': 7, 'Limited': 4}, rng)]
+
+
+def ratings(file):
+    with sqlite3.connect(file) as connection:
+        return connection.execute('''SELECT match_id, division, member_key, rating, uncertainty FROM ratings
+                                     ORDER BY match_id, division, member_key''').fetchall()
+
+
+def test_rate_division_returns_rows_without_writing(tmp_path, matches):
+    file = str(tmp_path / 'ratings.db')
+    rows = pipeline.rate_division('Carry Optics', [matches[1], matches[2], matches[0]], file=file)
+    assert len(rows) == 8 + 7 + 6
+    assert {row[4] for row in rows} == {'Carry Optics'}
+    assert ratings(file) == []
+
+
+def test_rate_all_serial_and_parallel_agree(tmp_path, matches):
+    serial, parallel = str(tmp_path / 'serial.db'), str(tmp_path / 'parallel.db')
+    assert pipeline.rate_all(matches, workers=1, file=serial) == {'Carry Optics': 3, 'Limited': 2}
+    assert pipeline.rate_all(matches, workers=2, file=parallel) == {'Carry Optics': 3, 'Limited': 2}
+    assert ratings(serial) == ratings(parallel)
+    assert len(ratings(serial)) == 8 + 7 + 6 + 4 + 5
+    assert {row[1] for row in ratings(serial)} == {'Carry Optics', 'Limited'}
+
+
+def test_rate_all_filters_divisions(tmp_path, matches):
+    file = str(tmp_path / 'ratings.db')
+    assert pipeline.rate_all(matches, divisions=['limited'], workers=1, file=file) == {'Limited': 2}
@@ -0,0 +1,57 @@
+import json
+
+import pytest
+
+from Utilities import practiscore as ps
+
+
+def write_match(path):
+    data = {'overall': [{'division': 'Open', 'firstname': 'Ann', 'lastname': 'Lee', 'uspsa_num': 'A1'},
+                        {'division': 'Open', 'firstname': 'Bob', 'lastname': 'Ray', 'uspsa_num': 'A2'}],
+            'stages': [{'number': 1, 'classifier': False}, {'number': 2, 'classifier': True}],
+            'scores': [{'competitor': 1, 'stage': 1, 'stage_points': 50.0},
+                       {'competitor': 2, 'stage': 1, 'stage_points': 100.0},
+                       {'competitor': 1, 'stage': 2, 'stage_points': 90.0},
+                       {'competitor': 2, 'stage': 2, 'stage_points': 10.0}]}
+    file = path / 'match.json'
+    file.write_text(json.dumps(data))
+    return str(file)
+
+
+def test_noclassifier_results(tmp_path):
+    data = ps.noclassifier(write_match(tmp_path))
+    assert [(c['firstname'], c['place'], c['percent']) for c in data['overall']] == [('Bob', 1, 100), ('Ann', 2, 50)]
+    assert [stage['number'] for stage in data['stages']] == [1]
+
+
+def test_noclassifier_returns_independent_copies(tmp_path):
+    file = write_match(tmp_path)
+    first = ps.noclassifier(file)
+    first['overall'][0]['division'] = 'Changed'
+    first['stages'].clear()
+
+    second = ps.noclassifier(file)
+    assert second['overall'][0]['division'] == 'Open'
+    assert [stage['number'] for stage in second['stages']] == [1]
+
+
+class Page:
+    def __init__(self, content):
+        self.content = content.encode()
+
+
+@pytest.mark.parametrize('body, url', [
+    ('<a href="https://practiscore.com/reports/web/1">Report</a>', 'https://practiscore.com/reports/web/1'),
+    ("<A class=btn HREF = 'https://practiscore.com/reports/web/2?a=1&amp;b=2'>",
+     'https://practiscore.com/reports/web/2?a=1&b=2'),
+    ('<a data-href="https://practiscore.com/reports/web/3" href="/other">x</a>'
+     '<a data-href="/other" href="https://practiscore.com/reports/web/4">Report</a>',
+     'https://practiscore.com/reports/web/4'),
+])
+def test_webreport(body, url):
+    assert ps.webreport(Page(body), 'https://practiscore.com') == url
+
+
+def test_webreport_ignores_data_href():
+    with pytest.raises(IndexError):
+        ps.webreport(Page('<a data-href="https://practiscore.com/reports/web/3">x</a>'), 'https://practiscore.com')
@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+
+from config import noob_uncertainty, uncertainty_min
+from Application import rating, store
+
+
+def competitors(count, unix, rng):
+    scores = list()
+    for place, percent in enumerate(sorted(rng.uniform(30, 100, count), reverse=True), start=1):
+        competitor = rating.Competitor()
+        competitor.first, competitor.last, competitor.member = 'First', 'Last%d' % place, 'A%d' % place
+        competitor.division, competitor.match_type = 'Open', 'USPSA'
+        competitor.place, competitor.percent, competitor.score = place, float(percent), float(percent)
+        competitor.stage_count, competitor.match_id, competitor.match_date_unix = 8, unix, unix
+        scores.append(competitor)
+    return scores
+
+
+def test_match_updates_uncertainty(tmp_path):
+    rng = np.random.default_rng(0)
+    ratings = store.RatingStore(file=str(tmp_path / 'ratings.db'), preload=False, collect=True)
+
+    first = rating.rate_match(competitors(10, 1, rng), 'Open', 'USPSA', ratings)
+    u_first = [competitor.uncertainty for competitor in first]
+    assert all(uncertainty_min <= u < noob_uncertainty for u in u_first)
+
+    second = rating.rate_match(competitors(10, 2, rng), 'Open', 'USPSA', ratings)
+    u_second = {competitor.member: competitor.uncertainty for competitor in second}
+    assert all(u_second[competitor.member] < u for competitor, u in zip(first, u_first))
+
+    ratings.flush()
+    assert [row[7] for row in ratings.rows] == u_first + [competitor.uncertainty for competitor in second]
+
+
+@pytest.mark.parametrize('method', ['normal', 'logistic'])
+def test_uncertainty_floor(method):
+    competitor = rating.Competitor()
+    competitor.rating, competitor.performance, competitor.uncertainty = 1000, 1100, uncertainty_min + 1
+    rating.new_uncertainty([competitor], uncertainty_min + 1, method=method)
+    assert competitor.uncertainty == uncertainty_min
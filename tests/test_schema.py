@@ -0,0 +1,86 @@
+import os
+import shutil
+import sqlite3
+
+import pytest
+
+from Application import schema
+
+
+shipped = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'Data', 'eloratings.db')
+
+
+def legacy_db(path, version=0):
+    file = str(path / 'legacy.db')
+    conn = sqlite3.connect(file)
+    conn.execute('''CREATE TABLE ratings ("First Name" TEXT, "Last Name" TEXT, "USPSA Number" TEXT,
+                    "DSSA Number" TEXT, "Match Type" TEXT, "Division" TEXT, "Elo" REAL, "Match ID" INTEGER,
+                    "Match Date" TEXT, "Match Date Unix" INTEGER)''')
+    conn.execute('''INSERT INTO ratings VALUES ('Ann', 'Lee', 'a123', 'D1', 'Pistol', 'Open', 1310.5, 7,
+                    '2020-01-01', 1577836800)''')
+    conn.execute('PRAGMA user_version={}'.format(version))
+    conn.commit()
+    conn.close()
+    return file
+
+
+def read(file, query):
+    conn = sqlite3.connect(file)
+    try:
+        return conn.execute(query).fetchall()
+    finally:
+        conn.close()
+
+
+def test_fresh_database(tmp_path):
+    file = str(tmp_path / 'fresh.db')
+    assert schema.migrate(file) == len(schema.migrations)
+    assert read(file, 'PRAGMA user_version')[0][0] == len(schema.migrations)
+    assert schema.migrate(file) == len(schema.migrations)
+
+
+@pytest.mark.skipif(not os.path.exists(shipped), reason='no shipped database')
+def test_shipped_database_copy(tmp_path):
+    file = str(tmp_path / 'eloratings.db')
+    shutil.copyfile(shipped, file)
+    schema.migrate(file)
+    assert read(file, 'PRAGMA user_version')[0][0] == len(schema.migrations)
+    assert [row[1] for row in read(file, 'PRAGMA table_info(ratings)')][:len(schema.columns)] == \
+        list(schema.columns)
+
+
+@pytest.mark.parametrize('version', [0, 1])
+def test_legacy_layout_is_migrated(tmp_path, version):
+    file = legacy_db(tmp_path, version)
+    schema.migrate(file)
+
+    assert read(file, 'SELECT first, last, uspsa_number, member_key, match_type, division, rating, match_id, '
+                      'match_date, match_date_unix FROM ratings') == \
+        [('Ann', 'Lee', 'a123', 'A123', 'Pistol', 'Open', 1310.5, 7, '2020-01-01', 1577836800)]
+    assert read(file, 'SELECT member_key, rating FROM current_ratings') == [('A123', 1310.5)]
+    assert read(file, 'SELECT "DSSA Number" FROM ratings_legacy') == [('D1',)]
+
+
+def test_unknown_layout_raises_before_version_bump(tmp_path):
+    file = str(tmp_path / 'unknown.db')
+    conn = sqlite3.connect(file)
+    conn.execute('CREATE TABLE ratings (name TEXT, score REAL)')
+    conn.commit()
+    conn.close()
+
+    with pytest.raises(IndexError, match='layout'):
+        schema.migrate(file)
+    assert read(file, 'PRAGMA user_version')[0][0] == 0
+
+
+def test_failed_step_rolls_back_its_version(tmp_path, monkeypatch):
+    def broken(cursor):
+        cursor.execute('CREATE TABLE half_done (x)')
+        raise RuntimeError('interrupted')
+
+    file = str(tmp_path / 'broken.db')
+    monkeypatch.setattr(schema, 'migrations', schema.migrations[:1] + (broken,))
+    with pytest.raises(RuntimeError):
+        schema.migrate(file)
+    assert read(file, 'PRAGMA user_version')[0][0] == 1
+    assert read(file, "SELECT name FROM sqlite_master WHERE name='half_done'") == []